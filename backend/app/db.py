@@ -2,21 +2,62 @@
 Database configuration and models for logging predictions.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean
+from sqlalchemy import create_engine, event, inspect, select, func, case, insert, text, Column, Integer, String, DateTime, Float, Boolean, Index, LargeBinary
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session, load_only
+from contextlib import contextmanager
 from datetime import datetime
+import hashlib
+import logging
 import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./phishing_detection.db")
 
-# Create engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+# Create engine with a bounded connection pool so concurrent requests
+# don't exhaust connections under load
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=20,
+    max_overflow=40,
+    pool_recycle=3600,
+    pool_pre_ping=True,
+    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+)
+
+# Async engine for non-blocking reads (analytics endpoints)
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1) if "sqlite" in DATABASE_URL else DATABASE_URL
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
+if "sqlite" in DATABASE_URL and ":memory:" not in DATABASE_URL:
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Enable WAL mode so prediction logging doesn't block analytics reads."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
+
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Thread-scoped session registry for code that runs outside request scope
+ScopedSession = scoped_session(SessionLocal)
+
+# Async session factory for async endpoints
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 # Create base class
 Base = declarative_base()
 
@@ -27,6 +68,7 @@ class PredictionLog(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, index=True)
+    url_sha1 = Column(LargeBinary(20), index=True, nullable=True)  # fixed-width key for URL grouping
     text = Column(String, nullable=True)
     prediction = Column(String, index=True)  # "Phishing" or "Legitimate"
     confidence = Column(Float)
@@ -35,6 +77,13 @@ class PredictionLog(Base):
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
 
+    # Composite indexes matching the analytics access patterns
+    __table_args__ = (
+        Index("ix_pred_mtype_ts", "model_type", timestamp.desc()),
+        Index("ix_pred_pred_ts", "prediction", timestamp.desc()),
+        Index("ix_pred_pred_url", "prediction", "url"),
+    )
+
 class URLBlacklist(Base):
     """Model for maintaining URL blacklist."""
     
@@ -42,6 +91,7 @@ class URLBlacklist(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, unique=True, index=True)
+    url_sha1 = Column(LargeBinary(20), unique=True, index=True, nullable=True)
     domain = Column(String, index=True)
     is_phishing = Column(Boolean, default=True)
     confidence = Column(Float)
@@ -51,19 +101,206 @@ class URLBlacklist(Base):
 
 class AnalyticsData(Base):
     """Model for storing analytics data."""
-    
+
     __tablename__ = "analytics_data"
-    
+
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(DateTime, index=True)
+    date = Column(DateTime, unique=True, index=True)
     total_predictions = Column(Integer, default=0)
     phishing_count = Column(Integer, default=0)
     legitimate_count = Column(Integer, default=0)
     avg_confidence = Column(Float, default=0.0)
 
 def create_tables():
-    """Create all database tables."""
+    """Create all database tables and apply additive migrations."""
     Base.metadata.create_all(bind=engine)
+    _run_schema_migrations()
+
+def _run_schema_migrations():
+    """Bring tables that predate newer columns/indexes up to the model schema.
+
+    create_all only creates missing tables, so a database from before
+    url_sha1 / the composite indexes / the unique analytics date existed
+    never receives them — and without them the bulk log INSERT and the
+    roll-up upsert fail on every flush.
+    """
+    inspector = inspect(engine)
+    binary_type = PredictionLog.url_sha1.type.compile(engine.dialect)
+
+    statements = []
+    for table in ("prediction_logs", "url_blacklist"):
+        try:
+            columns = {column["name"] for column in inspector.get_columns(table)}
+        except Exception as e:
+            logger.error(f"Error inspecting table {table}: {e}")
+            continue
+        if "url_sha1" not in columns:
+            statements.append(f"ALTER TABLE {table} ADD COLUMN url_sha1 {binary_type}")
+    statements += [
+        "CREATE INDEX IF NOT EXISTS ix_prediction_logs_url_sha1 ON prediction_logs (url_sha1)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_url_blacklist_url_sha1 ON url_blacklist (url_sha1)",
+        "CREATE INDEX IF NOT EXISTS ix_pred_mtype_ts ON prediction_logs (model_type, timestamp DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_pred_pred_ts ON prediction_logs (prediction, timestamp DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_pred_pred_url ON prediction_logs (prediction, url)",
+        # Fails (and is skipped) if historical duplicate dates exist;
+        # rebuild_analytics_rollup dedupes, after which it applies
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_analytics_data_date ON analytics_data (date)",
+    ]
+
+    # One transaction per statement so a skipped statement (e.g. the
+    # unique index above) doesn't poison the rest
+    for ddl in statements:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception as e:
+            logger.warning(f"Schema migration statement skipped: {e}")
+
+def url_hash(url: str):
+    """SHA-1 digest used as a compact, fixed-width URL key."""
+    if not url:
+        return None
+    return hashlib.sha1(url.encode("utf-8", "surrogatepass")).digest()
+
+def backfill_url_hashes():
+    """One-shot backfill of url_sha1 for rows written before the column existed."""
+    with session_scope() as db:
+        for model in (PredictionLog, URLBlacklist):
+            rows = db.query(model).options(
+                load_only(model.url, model.url_sha1)
+            ).filter(model.url_sha1.is_(None), model.url.isnot(None)).all()
+            for row in rows:
+                row.url_sha1 = url_hash(row.url)
+
+def record_prediction_rollup(db, prediction: str, confidence: float, when: datetime = None):
+    """Incrementally maintain the analytics_data daily roll-up for one prediction."""
+    when = when or datetime.utcnow()
+    day = datetime.combine(when.date(), datetime.min.time())
+    is_phishing = 1 if prediction == "Phishing" else 0
+    is_legitimate = 1 if prediction == "Legitimate" else 0
+    confidence = float(confidence or 0.0)
+
+    table = AnalyticsData.__table__
+    stmt = sqlite_insert(table).values(
+        date=day,
+        total_predictions=1,
+        phishing_count=is_phishing,
+        legitimate_count=is_legitimate,
+        avg_confidence=confidence
+    ).on_conflict_do_update(
+        index_elements=[table.c.date],
+        set_={
+            "total_predictions": table.c.total_predictions + 1,
+            "phishing_count": table.c.phishing_count + is_phishing,
+            "legitimate_count": table.c.legitimate_count + is_legitimate,
+            # Running mean over the day's predictions
+            "avg_confidence": (
+                table.c.avg_confidence * table.c.total_predictions + confidence
+            ) / (table.c.total_predictions + 1)
+        }
+    )
+    db.execute(stmt)
+
+# Core insert construct built once; executed with executemany over queued rows
+_LOG_INSERT = insert(PredictionLog.__table__)
+
+# Queued prediction logging: endpoints enqueue rows and a background
+# writer flushes them in bulk, so request latency never waits on a commit
+_log_queue = queue.Queue()
+_log_writer_stop = threading.Event()
+_log_writer_thread = None
+LOG_FLUSH_INTERVAL = 0.25  # seconds between flushes
+LOG_FLUSH_BATCH = 500      # max rows per bulk insert
+LOG_FLUSH_RETRIES = 3      # flush attempts before a row is dropped
+
+def enqueue_prediction_log(row: dict):
+    """Queue a prediction log row for background bulk insert."""
+    if "timestamp" not in row:
+        row["timestamp"] = datetime.utcnow()
+    if "url_sha1" not in row:
+        row["url_sha1"] = url_hash(row.get("url"))
+    _log_queue.put_nowait(row)
+
+def _drain_log_queue(max_rows: int):
+    rows = []
+    while len(rows) < max_rows:
+        try:
+            rows.append(_log_queue.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+def flush_prediction_logs():
+    """Flush queued log rows with one bulk INSERT (and roll-up updates)."""
+    rows = _drain_log_queue(LOG_FLUSH_BATCH)
+    if not rows:
+        return
+    try:
+        with session_scope() as db:
+            db.execute(_LOG_INSERT, [
+                {key: value for key, value in row.items() if key != "_attempts"}
+                for row in rows
+            ])
+            for row in rows:
+                record_prediction_rollup(db, row.get("prediction"), row.get("confidence"), row.get("timestamp"))
+    except Exception as e:
+        logger.error(f"Error flushing prediction logs: {e}")
+        # Re-queue so transient failures (e.g. a locked database file)
+        # retry on a later flush; the attempt cap keeps a poison row
+        # from wedging the writer forever
+        for row in rows:
+            attempts = row.get("_attempts", 0) + 1
+            if attempts < LOG_FLUSH_RETRIES:
+                row["_attempts"] = attempts
+                _log_queue.put_nowait(row)
+            else:
+                logger.error("Dropping prediction log row after repeated flush failures")
+
+def _log_writer_loop():
+    while not _log_writer_stop.is_set():
+        _log_writer_stop.wait(LOG_FLUSH_INTERVAL)
+        flush_prediction_logs()
+
+def start_log_writer():
+    """Start the background log writer thread."""
+    global _log_writer_thread
+    if _log_writer_thread is None or not _log_writer_thread.is_alive():
+        _log_writer_stop.clear()
+        _log_writer_thread = threading.Thread(target=_log_writer_loop, name="prediction-log-writer", daemon=True)
+        _log_writer_thread.start()
+
+def stop_log_writer():
+    """Stop the background writer, flushing anything still queued."""
+    _log_writer_stop.set()
+    if _log_writer_thread is not None:
+        _log_writer_thread.join(timeout=5)
+    while not _log_queue.empty():
+        flush_prediction_logs()
+
+def rebuild_analytics_rollup():
+    """Rebuild the analytics_data roll-up from prediction_logs from scratch."""
+    with session_scope() as db:
+        db.query(AnalyticsData).delete()
+
+        day_col = func.date(PredictionLog.timestamp)
+        rows = db.execute(
+            select(
+                day_col,
+                func.count(),
+                func.sum(case((PredictionLog.prediction == "Phishing", 1), else_=0)),
+                func.sum(case((PredictionLog.prediction == "Legitimate", 1), else_=0)),
+                func.avg(PredictionLog.confidence)
+            ).group_by(day_col)
+        ).all()
+
+        for day, total, phishing, legitimate, avg_confidence in rows:
+            db.add(AnalyticsData(
+                date=datetime.strptime(day, "%Y-%m-%d"),
+                total_predictions=total,
+                phishing_count=phishing or 0,
+                legitimate_count=legitimate or 0,
+                avg_confidence=float(avg_confidence) if avg_confidence is not None else 0.0
+            ))
 
 def get_db():
     """Get database session."""
@@ -73,5 +310,18 @@ def get_db():
     finally:
         db.close()
 
-# Create tables on import
-create_tables()
+async def get_async_db():
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@contextmanager
+def session_scope():
+    """Provide a transactional scope for writes (commits on success, rolls back on error)."""
+    db = ScopedSession()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
@@ -1,7 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from app.db import ScopedSession, create_tables, rebuild_analytics_rollup, backfill_url_hashes, start_log_writer, stop_log_writer
+from app.utils.blacklist import load_blacklist_filter
 from app.routers import predict, analytics, llm_predict
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,7 +16,8 @@ app = FastAPI(
     description="AI-powered phishing detection system using URL features and NLP analysis",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -24,6 +29,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def init_db():
+    """Create tables at startup; disable via AUTO_CREATE_TABLES=0 when migrations own the schema."""
+    if os.getenv("AUTO_CREATE_TABLES", "1") == "1":
+        create_tables()
+
+@app.on_event("startup")
+def rebuild_rollup_on_startup():
+    """Rebuild the analytics roll-up so it reflects any logs written while the app was down."""
+    try:
+        rebuild_analytics_rollup()
+        logger.info("Analytics roll-up rebuilt")
+    except Exception as e:
+        logger.error(f"Failed to rebuild analytics roll-up: {e}")
+
+@app.on_event("startup")
+def backfill_url_hashes_on_startup():
+    """Populate url_sha1 for rows logged before the hash column existed."""
+    try:
+        backfill_url_hashes()
+    except Exception as e:
+        logger.error(f"Failed to backfill URL hashes: {e}")
+
+@app.on_event("startup")
+def load_blacklist_on_startup():
+    """Build the in-memory blacklist bloom filter."""
+    load_blacklist_filter()
+
+@app.on_event("startup")
+def start_log_writer_on_startup():
+    """Start the background writer that bulk-inserts queued prediction logs."""
+    start_log_writer()
+
+@app.on_event("shutdown")
+def stop_log_writer_on_shutdown():
+    """Flush queued prediction logs before shutting down."""
+    stop_log_writer()
+
+@app.middleware("http")
+async def remove_scoped_session(request: Request, call_next):
+    """Release the thread-scoped DB session after each request."""
+    try:
+        return await call_next(request)
+    finally:
+        ScopedSession.remove()
+
 # Include routers
 app.include_router(predict.router)
 app.include_router(analytics.router)
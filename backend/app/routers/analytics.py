@@ -3,17 +3,23 @@ Analytics and history endpoints for the phishing detection system.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.db import get_db, PredictionLog, AnalyticsData
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, desc, case
+from app.db import get_async_db, AsyncSessionLocal, PredictionLog, AnalyticsData
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
 from datetime import datetime, timedelta
+from cachetools import TTLCache
 import logging
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 logger = logging.getLogger(__name__)
 
+# Short-lived cache for the heavier aggregate endpoints; the log table is
+# append-only so slightly stale results are acceptable
+_analytics_cache = TTLCache(maxsize=128, ttl=60)
+
 class PredictionHistory(BaseModel):
     id: int
     url: Optional[str]
@@ -24,6 +30,9 @@ class PredictionHistory(BaseModel):
     timestamp: datetime
     ip_address: Optional[str]
 
+# Built once so large history pages validate in a single batch call
+_history_adapter = TypeAdapter(List[PredictionHistory])
+
 class AnalyticsSummary(BaseModel):
     total_predictions: int
     phishing_count: int
@@ -39,66 +48,95 @@ class DailyStats(BaseModel):
     legitimate_count: int
     avg_confidence: float
 
+def _history_stmt(limit: int, offset: int, model_type: Optional[str], prediction: Optional[str]):
+    """Build the filtered, paginated history select over just the returned columns."""
+    stmt = select(
+        PredictionLog.id,
+        PredictionLog.url,
+        PredictionLog.text,
+        PredictionLog.prediction,
+        PredictionLog.confidence,
+        PredictionLog.model_type,
+        PredictionLog.timestamp,
+        PredictionLog.ip_address
+    )
+
+    if model_type:
+        stmt = stmt.where(PredictionLog.model_type == model_type)
+
+    if prediction:
+        stmt = stmt.where(PredictionLog.prediction == prediction)
+
+    return stmt.order_by(desc(PredictionLog.timestamp)).offset(offset).limit(limit)
+
+@router.get("/history/stream")
+async def stream_prediction_history(
+    limit: int = Query(1000, ge=1, le=100000),
+    offset: int = Query(0, ge=0),
+    model_type: Optional[str] = Query(None),
+    prediction: Optional[str] = Query(None)
+):
+    """Stream prediction history as newline-delimited JSON with constant memory."""
+    stmt = _history_stmt(limit, offset, model_type, prediction).execution_options(yield_per=200)
+
+    # The session must be opened inside the generator: a Depends-injected
+    # session is torn down when the handler returns, before Starlette
+    # iterates the response body, leaking the checked-out connection
+    async def generate():
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt)
+            async for row in result.mappings():
+                record = PredictionHistory.model_construct(**row)
+                yield record.model_dump_json() + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @router.get("/history", response_model=List[PredictionHistory])
-def get_prediction_history(
+async def get_prediction_history(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     model_type: Optional[str] = Query(None),
     prediction: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get prediction history with optional filters."""
     try:
-        query = db.query(PredictionLog)
-        
-        if model_type:
-            query = query.filter(PredictionLog.model_type == model_type)
-        
-        if prediction:
-            query = query.filter(PredictionLog.prediction == prediction)
-        
-        predictions = query.order_by(desc(PredictionLog.timestamp)).offset(offset).limit(limit).all()
-        
-        return [
-            PredictionHistory(
-                id=p.id,
-                url=p.url,
-                text=p.text,
-                prediction=p.prediction,
-                confidence=p.confidence,
-                model_type=p.model_type,
-                timestamp=p.timestamp,
-                ip_address=p.ip_address
-            )
-            for p in predictions
-        ]
+        result = await db.execute(_history_stmt(limit, offset, model_type, prediction))
+        predictions = result.mappings().all()
+
+        return _history_adapter.validate_python(predictions)
     except Exception as e:
         logger.error(f"Error fetching prediction history: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/summary", response_model=AnalyticsSummary)
-def get_analytics_summary(db: Session = Depends(get_db)):
+async def get_analytics_summary(db: AsyncSession = Depends(get_async_db)):
     """Get overall analytics summary."""
     try:
-        # Total predictions
-        total_predictions = db.query(PredictionLog).count()
-        
-        # Phishing vs legitimate counts
-        phishing_count = db.query(PredictionLog).filter(PredictionLog.prediction == "Phishing").count()
-        legitimate_count = db.query(PredictionLog).filter(PredictionLog.prediction == "Legitimate").count()
-        
-        # Average confidence
-        avg_confidence_result = db.query(func.avg(PredictionLog.confidence)).scalar()
-        avg_confidence = float(avg_confidence_result) if avg_confidence_result else 0.0
-        
-        # Model usage statistics
-        model_usage = {}
-        for model_type in ["url", "text", "hybrid"]:
-            count = db.query(PredictionLog).filter(PredictionLog.model_type == model_type).count()
-            model_usage[model_type] = count
-        
+        # Read totals from the pre-aggregated daily roll-up instead of scanning logs
+        totals = (await db.execute(
+            select(
+                func.sum(AnalyticsData.total_predictions),
+                func.sum(AnalyticsData.phishing_count),
+                func.sum(AnalyticsData.legitimate_count),
+                func.sum(AnalyticsData.avg_confidence * AnalyticsData.total_predictions)
+            )
+        )).one()
+
+        total_predictions = totals[0] or 0
+        phishing_count = totals[1] or 0
+        legitimate_count = totals[2] or 0
+        avg_confidence = float(totals[3] / total_predictions) if total_predictions > 0 else 0.0
+
+        # Model usage statistics via a single GROUP BY
+        usage_rows = (await db.execute(
+            select(PredictionLog.model_type, func.count()).group_by(PredictionLog.model_type)
+        )).all()
+        usage_counts = dict(usage_rows)
+        model_usage = {model_type: usage_counts.get(model_type, 0) for model_type in ["url", "text", "hybrid"]}
+
         phishing_percentage = (phishing_count / total_predictions * 100) if total_predictions > 0 else 0.0
-        
+
         return AnalyticsSummary(
             total_predictions=total_predictions,
             phishing_count=phishing_count,
@@ -112,99 +150,120 @@ def get_analytics_summary(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/daily-stats", response_model=List[DailyStats])
-def get_daily_stats(
+async def get_daily_stats(
     days: int = Query(7, ge=1, le=30),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get daily statistics for the last N days."""
     try:
         end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=days-1)
-        
+        range_start = datetime.combine(start_date, datetime.min.time())
+
+        # Read the requested window from the pre-aggregated daily roll-up
+        rows = (await db.execute(
+            select(AnalyticsData).where(AnalyticsData.date >= range_start)
+        )).scalars().all()
+
+        stats_by_day = {row.date.strftime("%Y-%m-%d"): row for row in rows}
+
+        # Fill gaps so every requested day appears in the response
         daily_stats = []
-        
         for i in range(days):
             current_date = start_date + timedelta(days=i)
-            
-            # Get predictions for this date
-            day_start = datetime.combine(current_date, datetime.min.time())
-            day_end = datetime.combine(current_date, datetime.max.time())
-            
-            day_predictions = db.query(PredictionLog).filter(
-                PredictionLog.timestamp >= day_start,
-                PredictionLog.timestamp <= day_end
-            ).all()
-            
-            total_predictions = len(day_predictions)
-            phishing_count = sum(1 for p in day_predictions if p.prediction == "Phishing")
-            legitimate_count = sum(1 for p in day_predictions if p.prediction == "Legitimate")
-            
-            avg_confidence = 0.0
-            if day_predictions:
-                avg_confidence = sum(p.confidence for p in day_predictions) / len(day_predictions)
-            
+            day_key = current_date.strftime("%Y-%m-%d")
+            row = stats_by_day.get(day_key)
+
             daily_stats.append(DailyStats(
-                date=current_date.strftime("%Y-%m-%d"),
-                total_predictions=total_predictions,
-                phishing_count=phishing_count,
-                legitimate_count=legitimate_count,
-                avg_confidence=avg_confidence
+                date=day_key,
+                total_predictions=row.total_predictions if row else 0,
+                phishing_count=row.phishing_count if row else 0,
+                legitimate_count=row.legitimate_count if row else 0,
+                avg_confidence=row.avg_confidence if row else 0.0
             ))
-        
+
         return daily_stats
     except Exception as e:
         logger.error(f"Error fetching daily stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/top-phishing-urls")
-def get_top_phishing_urls(
+async def get_top_phishing_urls(
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get most frequently detected phishing URLs."""
     try:
-        phishing_urls = db.query(
-            PredictionLog.url,
+        cache_key = ("top_phishing_urls", limit)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Group on the fixed-width hash; MAX(url) recovers the display value
+        stmt = select(
+            func.max(PredictionLog.url).label('url'),
             func.count(PredictionLog.id).label('count'),
             func.avg(PredictionLog.confidence).label('avg_confidence')
-        ).filter(
+        ).where(
             PredictionLog.prediction == "Phishing",
-            PredictionLog.url.isnot(None)
-        ).group_by(PredictionLog.url).order_by(desc('count')).limit(limit).all()
-        
-        return [
+            PredictionLog.url_sha1.isnot(None)
+        ).group_by(PredictionLog.url_sha1).order_by(desc('count')).limit(limit)
+
+        phishing_urls = (await db.execute(stmt)).mappings().all()
+
+        result = [
             {
-                "url": url,
-                "count": count,
-                "avg_confidence": float(avg_confidence)
+                "url": row["url"],
+                "count": row["count"],
+                "avg_confidence": float(row["avg_confidence"])
             }
-            for url, count, avg_confidence in phishing_urls
+            for row in phishing_urls
         ]
+        _analytics_cache[cache_key] = result
+        return result
     except Exception as e:
         logger.error(f"Error fetching top phishing URLs: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/model-performance")
-def get_model_performance(db: Session = Depends(get_db)):
+async def get_model_performance(db: AsyncSession = Depends(get_async_db)):
     """Get performance metrics for each model."""
     try:
+        cache_key = ("model_performance",)
+        cached = _analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         models = ["url", "text", "hybrid"]
+
+        # One grouped aggregate for all model types, consumed as plain mappings
+        rows = (await db.execute(
+            select(
+                PredictionLog.model_type.label("model_type"),
+                func.count().label("total"),
+                func.sum(case((PredictionLog.prediction == "Phishing", 1), else_=0)).label("phishing"),
+                func.avg(PredictionLog.confidence).label("avg_confidence")
+            ).where(
+                PredictionLog.model_type.in_(models)
+            ).group_by(PredictionLog.model_type)
+        )).mappings().all()
+
+        stats_by_model = {row["model_type"]: row for row in rows}
+
         performance = {}
-        
         for model_type in models:
-            predictions = db.query(PredictionLog).filter(PredictionLog.model_type == model_type).all()
-            
-            if predictions:
-                total = len(predictions)
-                phishing_count = sum(1 for p in predictions if p.prediction == "Phishing")
-                avg_confidence = sum(p.confidence for p in predictions) / total
-                
+            row = stats_by_model.get(model_type)
+
+            if row:
+                total = row["total"]
+                phishing_count = row["phishing"] or 0
+
                 performance[model_type] = {
                     "total_predictions": total,
                     "phishing_count": phishing_count,
                     "legitimate_count": total - phishing_count,
                     "phishing_percentage": (phishing_count / total) * 100,
-                    "avg_confidence": avg_confidence
+                    "avg_confidence": float(row["avg_confidence"]) if row["avg_confidence"] is not None else 0.0
                 }
             else:
                 performance[model_type] = {
@@ -214,8 +273,15 @@ def get_model_performance(db: Session = Depends(get_db)):
                     "phishing_percentage": 0.0,
                     "avg_confidence": 0.0
                 }
-        
+
+        _analytics_cache[cache_key] = performance
         return performance
     except Exception as e:
         logger.error(f"Error fetching model performance: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/cache/refresh")
+async def refresh_analytics_cache():
+    """Drop cached analytics so the next request recomputes them."""
+    _analytics_cache.clear()
+    return {"status": "cache cleared"}
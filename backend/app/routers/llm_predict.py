@@ -2,21 +2,44 @@
 LLM-based prediction endpoints for enhanced phishing analysis.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from app.db import get_db, PredictionLog
-from app.utils.llm_analyzer import llm_analyzer, LLMAnalysisResult
+from starlette.concurrency import run_in_threadpool
+from app.db import enqueue_prediction_log
+from app.utils.llm_analyzer import llm_analyzer, combine_results, LLMAnalysisResult
+from app.utils.load_models import model_loader
+from app.utils.blacklist import is_blacklisted
 from datetime import datetime
+import asyncio
 import logging
 from langchain.prompts import PromptTemplate  # type: ignore
 from langchain.chains import LLMChain  # type: ignore
-from app.utils.llm_analyzer import final_url_analysis  # add this import
 
 
 router = APIRouter(prefix="/llm-predict", tags=["LLM Prediction"])
 logger = logging.getLogger(__name__)
 
+# Explanation prompt is parsed once; the chain is built lazily on first use
+_EXPLAIN_PROMPT = PromptTemplate(
+    input_variables=["url", "text", "prediction"],
+    template="""
+Explain why this content was classified as {prediction}:
+
+URL: {url}
+Text: {text}
+
+Provide a detailed, educational explanation suitable for end users.
+"""
+)
+_explain_chain = None
+
+def _get_explain_chain():
+    """Build the explanation LLMChain once and reuse it across requests."""
+    global _explain_chain
+    if _explain_chain is None:
+        _explain_chain = LLMChain(llm=llm_analyzer.llm, prompt=_EXPLAIN_PROMPT)
+    return _explain_chain
+
 class URLRequest(BaseModel):
     url: str
     
@@ -61,25 +84,22 @@ class LLMPredictionResponse(BaseModel):
     timestamp: datetime
     llm_model: str
 
-def log_llm_prediction(db: Session, url: str = None, text: str = None, 
-                      result: LLMAnalysisResult = None, model_type: str = None, 
+def log_llm_prediction(url: str = None, text: str = None,
+                      result: LLMAnalysisResult = None, model_type: str = None,
                       request: Request = None):
-    """Log LLM prediction to database."""
+    """Queue LLM prediction for background bulk logging."""
     try:
-        log_entry = PredictionLog(
-            url=url,
-            text=text,
-            prediction=result.prediction,
-            confidence=result.confidence,
-            model_type=f"llm_{model_type}",
-            ip_address=request.client.host if request else None,
-            user_agent=request.headers.get("user-agent") if request else None
-        )
-        db.add(log_entry)
-        db.commit()
+        enqueue_prediction_log({
+            "url": url,
+            "text": text,
+            "prediction": result.prediction,
+            "confidence": result.confidence,
+            "model_type": f"llm_{model_type}",
+            "ip_address": request.client.host if request else None,
+            "user_agent": request.headers.get("user-agent") if request else None
+        })
     except Exception as e:
         logger.error(f"Error logging LLM prediction: {e}")
-        db.rollback()
 
 @router.get("/status")
 def get_llm_status():
@@ -99,19 +119,29 @@ def get_llm_status():
         raise HTTPException(status_code=500, detail="Failed to check LLM status")
 
 @router.post("/url", response_model=LLMPredictionResponse)
-def predict_url_llm(request: URLRequest, db: Session = Depends(get_db), http_request: Request = None):
+async def predict_url_llm(request: URLRequest, http_request: Request = None):
     """Analyze URL using LLM for enhanced phishing detection."""
     try:
         logger.info(f"LLM URL prediction requested: url={request.url}")
-        
+
+        # Known-bad URLs bypass both ML and LLM
+        if await run_in_threadpool(is_blacklisted, request.url):
+            prediction, confidence = "PHISHING", 1.0
+            explanation = "URL found in blacklist"
         # Try to use LLM if available, otherwise fallback to ML only
-        if llm_analyzer.is_available():
-            prediction, confidence = final_url_analysis(request.url)
+        elif llm_analyzer.is_available():
+            # Run the independent ML and LLM analyses concurrently; the
+            # LLM call awaits Ollama directly instead of holding a
+            # threadpool slot across the network wait
+            (ml_result, ml_confidence), llm_result = await asyncio.gather(
+                run_in_threadpool(model_loader.predict_url, request.url),
+                llm_analyzer.analyze_url_async(request.url)
+            )
+            prediction, confidence = combine_results(ml_result, ml_confidence, llm_result)
             explanation = f"Hybrid ML+LLM analysis (ML + {llm_analyzer.model_name})"
         else:
             # Fallback to ML-only analysis
-            from app.utils.load_models import model_loader
-            ml_result, ml_confidence = model_loader.predict_url(request.url)
+            ml_result, ml_confidence = await run_in_threadpool(model_loader.predict_url, request.url)
             prediction = ml_result.upper()
             confidence = ml_confidence
             explanation = "ML-only analysis (LLM unavailable)"
@@ -125,7 +155,7 @@ def predict_url_llm(request: URLRequest, db: Session = Depends(get_db), http_req
         )
         
         # Log prediction
-        log_llm_prediction(db, url=request.url, result=result, 
+        log_llm_prediction(url=request.url, result=result, 
                           model_type="url", request=http_request)
         
         logger.info(f"LLM URL prediction result: url={request.url} prediction={prediction} confidence={confidence:.4f}")
@@ -146,7 +176,7 @@ def predict_url_llm(request: URLRequest, db: Session = Depends(get_db), http_req
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/text", response_model=LLMPredictionResponse)
-def predict_text_llm(request: TextRequest, db: Session = Depends(get_db), http_request: Request = None):
+def predict_text_llm(request: TextRequest, http_request: Request = None):
     """Analyze text using LLM for enhanced phishing detection."""
     try:
         logger.info(f"LLM text prediction requested: text_length={len(request.text)}")
@@ -156,7 +186,6 @@ def predict_text_llm(request: TextRequest, db: Session = Depends(get_db), http_r
             result = llm_analyzer.analyze_text(request.text)
         else:
             # Fallback to ML-only analysis
-            from app.utils.load_models import model_loader
             ml_result, ml_confidence = model_loader.predict_text(request.text)
             result = LLMAnalysisResult(
                 prediction=ml_result.upper(),
@@ -167,7 +196,7 @@ def predict_text_llm(request: TextRequest, db: Session = Depends(get_db), http_r
             )
         
         # Log prediction
-        log_llm_prediction(db, text=request.text, result=result, 
+        log_llm_prediction(text=request.text, result=result, 
                           model_type="text", request=http_request)
         
         logger.info(f"LLM text prediction result: prediction={result.prediction} confidence={result.confidence:.4f}")
@@ -188,18 +217,29 @@ def predict_text_llm(request: TextRequest, db: Session = Depends(get_db), http_r
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/hybrid", response_model=LLMPredictionResponse)
-def predict_hybrid_llm(request: HybridRequest, db: Session = Depends(get_db), http_request: Request = None):
+async def predict_hybrid_llm(request: HybridRequest, http_request: Request = None):
     """Analyze both URL and text using LLM for comprehensive phishing detection."""
     try:
         logger.info(f"LLM hybrid prediction requested: url={request.url} text_length={len(request.text)}")
-        
+
         # Try to use LLM if available, otherwise fallback to ML only
         if llm_analyzer.is_available():
-            result = llm_analyzer.analyze_hybrid(request.url, request.text)
+            # ML and LLM analyses are independent, so run them concurrently
+            (ml_result, ml_confidence), llm_result = await asyncio.gather(
+                run_in_threadpool(model_loader.predict_hybrid, request.url, request.text),
+                run_in_threadpool(llm_analyzer.analyze_hybrid, request.url, request.text)
+            )
+            prediction, confidence = combine_results(ml_result, ml_confidence, llm_result)
+            result = LLMAnalysisResult(
+                prediction=prediction,
+                confidence=confidence,
+                explanation=llm_result.explanation,
+                risk_factors=llm_result.risk_factors,
+                recommendations=llm_result.recommendations
+            )
         else:
             # Fallback to ML-only analysis
-            from app.utils.load_models import model_loader
-            ml_result, ml_confidence = model_loader.predict_hybrid(request.url, request.text)
+            ml_result, ml_confidence = await run_in_threadpool(model_loader.predict_hybrid, request.url, request.text)
             result = LLMAnalysisResult(
                 prediction=ml_result.upper(),
                 confidence=ml_confidence,
@@ -209,7 +249,7 @@ def predict_hybrid_llm(request: HybridRequest, db: Session = Depends(get_db), ht
             )
         
         # Log prediction
-        log_llm_prediction(db, url=request.url, text=request.text, result=result, 
+        log_llm_prediction(url=request.url, text=request.text, result=result, 
                           model_type="hybrid", request=http_request)
         
         logger.info(f"LLM hybrid prediction result: prediction={result.prediction} confidence={result.confidence:.4f}")
@@ -241,24 +281,10 @@ def explain_prediction(request: dict):
         url = request.get("url", "")
         text = request.get("text", "")
         original_prediction = request.get("prediction", "")
-        
-        # Create explanation prompt
-        explanation_prompt = f"""
-        Explain why this content was classified as {original_prediction}:
-        
-        URL: {url}
-        Text: {text}
-        
-        Provide a detailed, educational explanation suitable for end users.
-        """
-        
-        # Use LLM to generate explanation
-        chain = LLMChain(llm=llm_analyzer.llm, prompt=PromptTemplate(
-            input_variables=["content"],
-            template="{content}"
-        ))
-        
-        explanation = chain.invoke({"content": explanation_prompt})
+
+        # Use the precompiled chain to generate the explanation
+        chain = _get_explain_chain()
+        explanation = chain.invoke({"url": url, "text": text, "prediction": original_prediction})
         
         return {
             "explanation": explanation,
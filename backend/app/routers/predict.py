@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, HttpUrl
-from sqlalchemy.orm import Session
-from app.utils.load_models import predict_url, predict_text, predict_hybrid
-from app.db import get_db, PredictionLog
+from starlette.concurrency import run_in_threadpool
+from app.utils.load_models import model_loader
+from app.utils.batching import MicroBatcher
+from app.utils.blacklist import is_blacklisted
+from app.db import enqueue_prediction_log
 from datetime import datetime
+from typing import List
 import logging
 
 router = APIRouter(prefix="/predict", tags=["Prediction"])
 logger = logging.getLogger(__name__)
 
+# Requests landing within the batching window share one model inference
+_url_batcher = MicroBatcher(model_loader.predict_url_batch)
+_text_batcher = MicroBatcher(model_loader.predict_text_batch)
+_hybrid_batcher = MicroBatcher(model_loader.predict_hybrid_batch)
+
 class URLRequest(BaseModel):
     url: str
     
@@ -19,6 +27,16 @@ class URLRequest(BaseModel):
             }
         }
 
+class URLBatchRequest(BaseModel):
+    urls: List[str]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "urls": ["https://example.com", "https://secure-bank-verification.tk/login"]
+            }
+        }
+
 class TextRequest(BaseModel):
     text: str
     
@@ -49,36 +67,37 @@ class PredictionResponse(BaseModel):
     model_type: str
     timestamp: datetime
 
-def log_prediction(db: Session, url: str = None, text: str = None, 
-                  prediction: str = None, confidence: float = None, 
+def log_prediction(url: str = None, text: str = None,
+                  prediction: str = None, confidence: float = None,
                   model_type: str = None, request: Request = None):
-    """Log prediction to database."""
+    """Queue prediction for background bulk logging."""
     try:
-        log_entry = PredictionLog(
-            url=url,
-            text=text,
-            prediction=prediction,
-            confidence=confidence,
-            model_type=model_type,
-            ip_address=request.client.host if request else None,
-            user_agent=request.headers.get("user-agent") if request else None
-        )
-        db.add(log_entry)
-        db.commit()
+        enqueue_prediction_log({
+            "url": url,
+            "text": text,
+            "prediction": prediction,
+            "confidence": confidence,
+            "model_type": model_type,
+            "ip_address": request.client.host if request else None,
+            "user_agent": request.headers.get("user-agent") if request else None
+        })
     except Exception as e:
         logger.error(f"Error logging prediction: {e}")
-        db.rollback()
 
 @router.post("/url", response_model=PredictionResponse)
-def predict_url_endpoint(request: URLRequest, db: Session = Depends(get_db), http_request: Request = None):
+async def predict_url_endpoint(request: URLRequest, http_request: Request = None):
     """Predict phishing probability for a URL."""
     try:
         logger.info(f"Predict URL requested: url={request.url}")
-        result, confidence = predict_url(request.url)
+        if await run_in_threadpool(is_blacklisted, request.url):
+            # Known-bad URL: skip the model entirely
+            result, confidence = "Phishing", 1.0
+        else:
+            result, confidence = await _url_batcher.submit(request.url)
         logger.info(f"Predict URL result: url={request.url} result={result} confidence={confidence:.4f}")
         
         # Log prediction
-        log_prediction(db, url=request.url, prediction=result, 
+        log_prediction(url=request.url, prediction=result, 
                       confidence=confidence, model_type="url", request=http_request)
         
         return PredictionResponse(
@@ -92,16 +111,40 @@ def predict_url_endpoint(request: URLRequest, db: Session = Depends(get_db), htt
         logger.error(f"Error in URL prediction for url={request.url}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/batch", response_model=List[PredictionResponse])
+async def predict_url_batch_endpoint(request: URLBatchRequest, http_request: Request = None):
+    """Score a list of URLs in one stacked model call."""
+    try:
+        logger.info(f"Predict URL batch requested: count={len(request.urls)}")
+        results = await run_in_threadpool(model_loader.predict_url_batch, request.urls)
+
+        timestamp = datetime.utcnow()
+        responses = []
+        for url, (result, confidence) in zip(request.urls, results):
+            log_prediction(url=url, prediction=result,
+                          confidence=confidence, model_type="url", request=http_request)
+            responses.append(PredictionResponse(
+                url=url,
+                prediction=result,
+                confidence=confidence,
+                model_type="url",
+                timestamp=timestamp
+            ))
+        return responses
+    except Exception as e:
+        logger.error(f"Error in URL batch prediction: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.post("/text", response_model=PredictionResponse)
-def predict_text_endpoint(request: TextRequest, db: Session = Depends(get_db), http_request: Request = None):
+async def predict_text_endpoint(request: TextRequest, http_request: Request = None):
     """Predict phishing probability for text content."""
     try:
         logger.info("Predict Text requested")
-        result, confidence = predict_text(request.text)
+        result, confidence = await _text_batcher.submit(request.text)
         logger.info(f"Predict Text result: result={result} confidence={confidence:.4f}")
         
         # Log prediction
-        log_prediction(db, text=request.text, prediction=result, 
+        log_prediction(text=request.text, prediction=result, 
                       confidence=confidence, model_type="text", request=http_request)
         
         return PredictionResponse(
@@ -116,15 +159,15 @@ def predict_text_endpoint(request: TextRequest, db: Session = Depends(get_db), h
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/hybrid", response_model=PredictionResponse)
-def predict_hybrid_endpoint(request: HybridRequest, db: Session = Depends(get_db), http_request: Request = None):
+async def predict_hybrid_endpoint(request: HybridRequest, http_request: Request = None):
     """Predict phishing probability using hybrid model (URL + text)."""
     try:
         logger.info(f"Predict Hybrid requested: url={request.url} text_present={bool(request.text)}")
-        result, confidence = predict_hybrid(request.url, request.text)
+        result, confidence = await _hybrid_batcher.submit((request.url, request.text))
         logger.info(f"Predict Hybrid result: url={request.url} result={result} confidence={confidence:.4f}")
         
         # Log prediction
-        log_prediction(db, url=request.url, text=request.text, prediction=result, 
+        log_prediction(url=request.url, text=request.text, prediction=result, 
                       confidence=confidence, model_type="hybrid", request=http_request)
         
         return PredictionResponse(
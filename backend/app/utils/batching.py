@@ -0,0 +1,64 @@
+"""
+Micro-batching helper for model inference.
+Coalesces single-item requests arriving within a short window into one
+batched call, so concurrent traffic shares a single model invocation.
+"""
+
+import asyncio
+from starlette.concurrency import run_in_threadpool
+
+class MicroBatcher:
+    """Collect items for a few milliseconds and process them in one batch."""
+
+    def __init__(self, batch_fn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Args:
+            batch_fn: sync function taking a list of items, returning a list of results
+            max_batch_size: flush as soon as this many items are queued
+            max_wait_ms: flush after this long even if the batch is not full
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None  # created lazily so it binds to the running loop
+        self._worker = None
+
+    async def submit(self, item):
+        """Queue one item and wait for its result from the next batch."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block for the first item, then drain until full or the window closes
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = await run_in_threadpool(self.batch_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
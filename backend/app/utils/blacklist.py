@@ -0,0 +1,77 @@
+"""
+In-memory bloom filter in front of the URL blacklist table.
+Lets the prediction endpoints skip the ML/LLM pipeline for known-bad URLs.
+"""
+
+import logging
+import threading
+from pybloom_live import BloomFilter  # type: ignore
+from app.db import session_scope, url_hash, URLBlacklist
+
+logger = logging.getLogger(__name__)
+
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 1e-4
+
+_bloom = None
+_bloom_lock = threading.Lock()
+
+def load_blacklist_filter():
+    """(Re)build the bloom filter from the url_blacklist table."""
+    global _bloom
+    bloom = BloomFilter(capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE)
+    try:
+        with session_scope() as db:
+            rows = db.query(URLBlacklist.url_sha1).filter(URLBlacklist.is_phishing.is_(True)).all()
+            for (digest,) in rows:
+                if digest:
+                    bloom.add(digest)
+    except Exception as e:
+        logger.error(f"Failed to load blacklist filter: {e}")
+    with _bloom_lock:
+        _bloom = bloom
+
+def is_blacklisted(url: str) -> bool:
+    """Check a URL against the bloom filter, confirming hits against the DB."""
+    if _bloom is None:
+        return False
+
+    digest = url_hash(url)
+    if digest is None or digest not in _bloom:
+        return False
+
+    # Bloom filters can false-positive, so confirm with an indexed lookup
+    try:
+        with session_scope() as db:
+            hit = db.query(URLBlacklist.id).filter(
+                URLBlacklist.url_sha1 == digest,
+                URLBlacklist.is_phishing.is_(True)
+            ).first()
+            return hit is not None
+    except Exception as e:
+        logger.error(f"Blacklist lookup failed: {e}")
+        return False
+
+def add_to_blacklist(url: str, confidence: float = 1.0, source: str = "model"):
+    """Insert a URL into the blacklist and refresh the filter incrementally."""
+    digest = url_hash(url)
+    if digest is None:
+        return
+
+    try:
+        with session_scope() as db:
+            exists = db.query(URLBlacklist.id).filter(URLBlacklist.url_sha1 == digest).first()
+            if exists is None:
+                db.add(URLBlacklist(
+                    url=url,
+                    url_sha1=digest,
+                    domain=url.split("//")[-1].split("/")[0].lower(),
+                    is_phishing=True,
+                    confidence=confidence,
+                    source=source
+                ))
+        if _bloom is not None:
+            with _bloom_lock:
+                _bloom.add(digest)
+    except Exception as e:
+        logger.error(f"Failed to add URL to blacklist: {e}")
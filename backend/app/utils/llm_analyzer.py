@@ -3,21 +3,31 @@ LLM-based phishing analysis using Ollama and LangChain.
 Provides enhanced text understanding and explainable predictions.
 """
 
+import hashlib
 import os
 import json
 import logging
+import re
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 import requests
 import joblib
+from cachetools import TTLCache
 from langchain.prompts import PromptTemplate  # type: ignore
 from langchain.chains import LLMChain  # type: ignore
 from langchain.schema import BaseOutputParser  # type: ignore
 from langchain_ollama import OllamaLLM  # type: ignore
 from app.utils.feature_extraction import URLFeatureExtractor
+from app.utils.load_models import model_loader
 
 logger = logging.getLogger(__name__)
 
+# Compiled once for the confidence-percentage fallback parse
+_PCT_RE = re.compile(r'(\d+)%')
+
+# Shared decoder; raw_decode parses a prefix object without rescanning
+_JSON_DECODER = json.JSONDecoder()
+
 @dataclass
 class LLMAnalysisResult:
     """Result from LLM analysis."""
@@ -33,15 +43,19 @@ class PhishingAnalysisParser(BaseOutputParser):
     def parse(self, text: str) -> Dict:
         """Parse LLM response into structured format."""
         try:
-            # Try to extract JSON from response
-            if "{" in text and "}" in text:
-                start = text.find("{")
-                end = text.rfind("}") + 1
-                json_str = text[start:end]
-                return json.loads(json_str)
-            else:
-                # Fallback parsing
-                return self._fallback_parse(text)
+            # Try to extract JSON from response; raw_decode parses the
+            # object in place, tolerating trailing commentary with no
+            # rfind scan over the rest of the response
+            start = text.find("{")
+            if start >= 0:
+                try:
+                    obj, _ = _JSON_DECODER.raw_decode(text, start)
+                    return obj
+                except json.JSONDecodeError:
+                    pass
+
+            # Fallback parsing
+            return self._fallback_parse(text)
         except Exception as e:
             logger.warning(f"Failed to parse LLM response: {e}")
             return self._fallback_parse(text)
@@ -62,8 +76,7 @@ class PhishingAnalysisParser(BaseOutputParser):
         confidence = 0.5  # Default
         if "%" in text:
             try:
-                import re
-                percentages = re.findall(r'(\d+)%', text)
+                percentages = _PCT_RE.findall(text)
                 if percentages:
                     confidence = float(percentages[0]) / 100.0
             except:
@@ -92,7 +105,12 @@ class LLMPhishingAnalyzer:
         self.base_url = base_url
         self.llm = None
         self.parser = PhishingAnalysisParser()
-        
+
+        # Completed URL analyses keyed by URL digest; repeat submissions
+        # skip the multi-second LLM round-trip entirely
+        self._url_cache = TTLCache(maxsize=50_000, ttl=3600)
+
+
         # Initialize LLM
         self._initialize_llm()
         
@@ -225,40 +243,94 @@ Response format (JSON only):
 }}
 """
         )
-    
+
+        # Build the chains once; constructing an LLMChain per call
+        # allocates several pydantic models for no benefit
+        if self.llm:
+            self._text_chain = LLMChain(llm=self.llm, prompt=self.text_prompt, output_parser=self.parser)
+            self._hybrid_chain = LLMChain(llm=self.llm, prompt=self.hybrid_prompt, output_parser=self.parser)
+        else:
+            self._text_chain = None
+            self._hybrid_chain = None
+
+    @staticmethod
+    def _url_cache_key(url: str) -> bytes:
+        """Compact fixed-width cache key for a URL."""
+        return hashlib.blake2b(url.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
     def analyze_url(self, url: str) -> LLMAnalysisResult:
         """Analyze URL using LLM."""
         if not self.llm:
             return self._fallback_result("LLM not available")
-        
+
+        cache_key = self._url_cache_key(url)
+        cached = self._url_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            chain = LLMChain(llm=self.llm, prompt=self.url_prompt)
-            raw_output = chain.invoke({"url": url})
+            raw_output = self.llm.invoke(self.url_prompt.format(url=url))
             result = self.parser.parse(raw_output)
 
             # Enforce stricter phishing bias
             if result.get("prediction") == "LEGITIMATE" and result.get("confidence", 0.5) < 0.9:
                 result["prediction"] = "PHISHING"
-            
-            return LLMAnalysisResult(
+
+            analysis = LLMAnalysisResult(
                 prediction=result.get("prediction", "UNKNOWN"),
                 confidence=result.get("confidence", 0.5),
                 explanation=result.get("explanation", "No explanation available"),
                 risk_factors=result.get("risk_factors", []),
                 recommendations=result.get("recommendations", [])
             )
+            self._url_cache[cache_key] = analysis
+            return analysis
         except Exception as e:
             logger.error(f"LLM URL analysis failed: {e}")
             return self._fallback_result(f"Analysis failed: {str(e)}")
-    
+
+    async def analyze_url_async(self, url: str) -> LLMAnalysisResult:
+        """Analyze URL via Ollama without blocking the event loop.
+
+        Formats the prompt directly and calls the model's ainvoke,
+        skipping the LLMChain wrapper on the hot path.
+        """
+        if not self.llm:
+            return self._fallback_result("LLM not available")
+
+        cache_key = self._url_cache_key(url)
+        cached = self._url_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            raw_output = await self.llm.ainvoke(self.url_prompt.format(url=url))
+            result = self.parser.parse(raw_output)
+
+            # Enforce stricter phishing bias
+            if result.get("prediction") == "LEGITIMATE" and result.get("confidence", 0.5) < 0.9:
+                result["prediction"] = "PHISHING"
+
+            analysis = LLMAnalysisResult(
+                prediction=result.get("prediction", "UNKNOWN"),
+                confidence=result.get("confidence", 0.5),
+                explanation=result.get("explanation", "No explanation available"),
+                risk_factors=result.get("risk_factors", []),
+                recommendations=result.get("recommendations", [])
+            )
+            self._url_cache[cache_key] = analysis
+            return analysis
+        except Exception as e:
+            logger.error(f"LLM URL analysis failed: {e}")
+            return self._fallback_result(f"Analysis failed: {str(e)}")
+
     def analyze_text(self, text: str) -> LLMAnalysisResult:
         """Analyze text using LLM."""
         if not self.llm:
             return self._fallback_result("LLM not available")
         
         try:
-            chain = LLMChain(llm=self.llm, prompt=self.text_prompt, output_parser=self.parser)
-            result = chain.invoke({"text":text})
+            result = self._text_chain.invoke({"text": text})
             
             return LLMAnalysisResult(
                 prediction=result.get("prediction", "UNKNOWN"),
@@ -277,8 +349,7 @@ Response format (JSON only):
             return self._fallback_result("LLM not available")
         
         try:
-            chain = LLMChain(llm=self.llm, prompt=self.hybrid_prompt, output_parser=self.parser)
-            result = chain.invoke({"url": url, "text":text})
+            result = self._hybrid_chain.invoke({"url": url, "text": text})
             
             return LLMAnalysisResult(
                 prediction=result.get("prediction", "UNKNOWN"),
@@ -327,30 +398,33 @@ Response format (JSON only):
 # Global LLM analyzer instance
 llm_analyzer = LLMPhishingAnalyzer()
 
+def combine_results(ml_result: str, ml_confidence: float, llm_result: LLMAnalysisResult) -> Tuple[str, float]:
+    """Fuse ML and LLM verdicts into a single prediction/confidence pair."""
+    ml_is_phishing = ml_result.lower() == "phishing"
+
+    if ml_is_phishing and llm_result.prediction.upper() == "PHISHING":
+        # Both agree on phishing - high confidence
+        return "PHISHING", max(0.9, (ml_confidence + llm_result.confidence) / 2)
+    elif ml_is_phishing or llm_result.prediction.upper() == "PHISHING":
+        # One suggests phishing - medium confidence
+        return "PHISHING", max(0.7, (ml_confidence + llm_result.confidence) / 2)
+    else:
+        # Both agree on legitimate - use average confidence
+        return "LEGITIMATE", (ml_confidence + llm_result.confidence) / 2
+
 def final_url_analysis(url: str):
     """Combined ML + LLM analysis for URL."""
     try:
         # Step 1: Run ML model using the same feature extraction as the main system
-        from app.utils.load_models import model_loader
-        
         # Use the existing model loader to get consistent predictions
         ml_result, ml_confidence = model_loader.predict_url(url)
-        ml_is_phishing = ml_result.lower() == "phishing"
-        
+
         # Step 2: Run LLM analysis
         llm_result = llm_analyzer.analyze_url(url)
-        
+
         # Step 3: Combine results (weighted average)
-        if ml_is_phishing and llm_result.prediction.upper() == "PHISHING":
-            # Both agree on phishing - high confidence
-            return "PHISHING", max(0.9, (ml_confidence + llm_result.confidence) / 2)
-        elif ml_is_phishing or llm_result.prediction.upper() == "PHISHING":
-            # One suggests phishing - medium confidence
-            return "PHISHING", max(0.7, (ml_confidence + llm_result.confidence) / 2)
-        else:
-            # Both agree on legitimate - use average confidence
-            return "LEGITIMATE", (ml_confidence + llm_result.confidence) / 2
-            
+        return combine_results(ml_result, ml_confidence, llm_result)
+
     except Exception as e:
         logger.error(f"Error in final_url_analysis: {e}")
         # Fallback to just LLM if ML fails
@@ -2,13 +2,47 @@
 Model loading and prediction utilities.
 """
 
+import functools
+import operator
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import joblib
+from joblib import Parallel, delayed
 import numpy as np
 from typing import Tuple, Dict, Any, List, Optional
 import os
 import logging
 from app.utils.feature_extraction import URLFeatureExtractor, NLPFeatureExtractor, HybridFeatureExtractor
 
+# ONNX sessions are preferred when the runtime and exported graphs exist;
+# everything falls back to the joblib pickles otherwise
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# Below this many rows, thread fan-out costs more than it saves
+_PARALLEL_MIN_ROWS = 64
+
+class _OnnxModel:
+    """Adapter exposing the sklearn predict_proba surface over an ONNX session."""
+
+    def __init__(self, path: str):
+        self._session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        # Exported graphs declare [None, n_features]; exposing the width
+        # lets the warm-up pass shape its dummy row like for sklearn models
+        shape = model_input.shape
+        self.n_features_in_ = shape[1] if len(shape) > 1 and isinstance(shape[1], int) else 1
+        # Training targets are 0=legitimate / 1=phishing
+        self.classes_ = np.array([0, 1])
+
+    def predict_proba(self, matrix: np.ndarray) -> np.ndarray:
+        outputs = self._session.run(None, {self._input_name: np.asarray(matrix, dtype=np.float32)})
+        # convert_sklearn(zipmap=False) emits [labels, probabilities]
+        return np.asarray(outputs[-1])
+
 class ModelLoader:
     """Load and manage ML models."""
     
@@ -27,9 +61,30 @@ class ModelLoader:
         self.nlp_extractor = NLPFeatureExtractor()
         self.hybrid_extractor = HybridFeatureExtractor()
         
-        # Load models
-        self._load_models()
-    
+        # Repeat submissions of the same text skip feature extraction,
+        # vectorization and scaling; this is safe because the text
+        # pipeline is deterministic. The hybrid pipeline is NOT cached
+        # here — its rows embed WHOIS and fetched-page data whose
+        # staleness is bounded by the TTL caches in feature_extraction
+        self._vectorize_text_cached = functools.lru_cache(maxsize=4096)(self._vectorize_text)
+
+        # Models load lazily so importing this module (and app startup)
+        # doesn't block on the joblib reads; the background thread
+        # pre-warms them so the first request isn't penalized either
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        threading.Thread(target=self._ensure_loaded, daemon=True,
+                         name='model-prewarm').start()
+
+    def _ensure_loaded(self):
+        """Load models on first use (double-checked lock)."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load_models()
+                self._loaded = True
+
     def _load_models(self):
         """Load all trained models and their preprocessing artifacts."""
         models_dir = os.path.join(os.path.dirname(__file__), '..', 'models')
@@ -37,79 +92,275 @@ class ModelLoader:
         # Normalize path
         models_dir = os.path.abspath(models_dir)
         
-        # Load URL model and artifacts
+        # The three artifact triples are independent; joblib releases the
+        # GIL while reading the NumPy payloads, so loading them on threads
+        # overlaps the file I/O and pickle work
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(loader, models_dir)
+                       for loader in (self._load_url_artifacts,
+                                      self._load_text_artifacts,
+                                      self._load_hybrid_artifacts)]
+            for future in futures:
+                future.result()
+
+        self._finalize_models()
+
+    def _load_url_artifacts(self, models_dir):
+        """Load the URL model, scaler and feature names."""
         try:
             url_model_path = os.path.join(models_dir, 'url_model.pkl')
             url_scaler_path = os.path.join(models_dir, 'url_scaler.pkl')
             url_features_path = os.path.join(models_dir, 'url_feature_names.pkl')
-            if os.path.exists(url_model_path):
-                self.url_model = joblib.load(url_model_path)
+            url_onnx_path = os.path.join(models_dir, 'url_model.onnx')
+            if ort is not None and os.path.exists(url_onnx_path):
+                self.url_model = _OnnxModel(url_onnx_path)
+                self.logger.info("URL model loaded (ONNX)")
+            elif os.path.exists(url_model_path):
+                # mmap the numeric arrays read-only: pages load lazily and
+                # are shared across forked workers via the page cache
+                self.url_model = joblib.load(url_model_path, mmap_mode='r')
                 self.logger.info("URL model loaded")
             if os.path.exists(url_scaler_path):
-                self.url_scaler = joblib.load(url_scaler_path)
+                self.url_scaler = joblib.load(url_scaler_path, mmap_mode='r')
                 self.logger.info("URL scaler loaded")
             if os.path.exists(url_features_path):
                 self.url_feature_names = joblib.load(url_features_path)
                 self.logger.info("URL feature names loaded")
         except Exception as e:
             self.logger.error(f"Error loading URL artifacts: {e}")
-        
-        # Load text model and artifacts
+
+    def _load_text_artifacts(self, models_dir):
+        """Load the text model, scaler, feature names and vectorizer."""
         try:
             text_model_path = os.path.join(models_dir, 'text_model.pkl')
             text_scaler_path = os.path.join(models_dir, 'text_scaler.pkl')
             text_features_path = os.path.join(models_dir, 'text_feature_names.pkl')
-            tfidf_path = os.path.join(models_dir, 'tfidf_vectorizer.pkl')
-            if os.path.exists(text_model_path):
-                self.text_model = joblib.load(text_model_path)
+            text_onnx_path = os.path.join(models_dir, 'text_model.onnx')
+            if ort is not None and os.path.exists(text_onnx_path):
+                self.text_model = _OnnxModel(text_onnx_path)
+                self.logger.info("Text model loaded (ONNX)")
+            elif os.path.exists(text_model_path):
+                self.text_model = joblib.load(text_model_path, mmap_mode='r')
                 self.logger.info("Text model loaded")
             if os.path.exists(text_scaler_path):
-                self.text_scaler = joblib.load(text_scaler_path)
+                self.text_scaler = joblib.load(text_scaler_path, mmap_mode='r')
                 self.logger.info("Text scaler loaded")
             if os.path.exists(text_features_path):
                 self.text_feature_names = joblib.load(text_features_path)
                 self.logger.info("Text feature names loaded")
-            if os.path.exists(tfidf_path):
-                self.nlp_extractor.load_tfidf_vectorizer(tfidf_path)
-                self.logger.info("TF-IDF vectorizer loaded")
+            # Stateless hashing vectorizer; nothing on disk to load
+            self.nlp_extractor.load_tfidf_vectorizer()
+            self.logger.info("Text vectorizer initialized")
         except Exception as e:
             self.logger.error(f"Error loading Text artifacts: {e}")
-        
-        # Load hybrid model and artifacts
+
+    def _load_hybrid_artifacts(self, models_dir):
+        """Load the hybrid model, scaler and feature names."""
         try:
             hybrid_model_path = os.path.join(models_dir, 'hybrid_model.pkl')
             hybrid_scaler_path = os.path.join(models_dir, 'hybrid_scaler.pkl')
             hybrid_features_path = os.path.join(models_dir, 'hybrid_feature_names.pkl')
-            if os.path.exists(hybrid_model_path):
-                self.hybrid_model = joblib.load(hybrid_model_path)
+            hybrid_onnx_path = os.path.join(models_dir, 'hybrid_model.onnx')
+            if ort is not None and os.path.exists(hybrid_onnx_path):
+                self.hybrid_model = _OnnxModel(hybrid_onnx_path)
+                self.logger.info("Hybrid model loaded (ONNX)")
+            elif os.path.exists(hybrid_model_path):
+                self.hybrid_model = joblib.load(hybrid_model_path, mmap_mode='r')
                 self.logger.info("Hybrid model loaded")
             if os.path.exists(hybrid_scaler_path):
-                self.hybrid_scaler = joblib.load(hybrid_scaler_path)
+                self.hybrid_scaler = joblib.load(hybrid_scaler_path, mmap_mode='r')
                 self.logger.info("Hybrid scaler loaded")
             if os.path.exists(hybrid_features_path):
                 self.hybrid_feature_names = joblib.load(hybrid_features_path)
                 self.logger.info("Hybrid feature names loaded")
         except Exception as e:
             self.logger.error(f"Error loading Hybrid artifacts: {e}")
-    
+
+    def _finalize_models(self):
+        """Warm up the loaded models and compile the row schemas."""
+        # Pickled estimators come back with their training-time n_jobs;
+        # reset to all cores and run one throwaway row through each model
+        # so lazy state initializes before the first real request
+        for model, scaler in ((self.url_model, self.url_scaler),
+                              (self.text_model, self.text_scaler),
+                              (self.hybrid_model, self.hybrid_scaler)):
+            if model is None:
+                continue
+            if hasattr(model, 'n_jobs'):
+                model.n_jobs = -1
+            try:
+                dummy = np.zeros((1, getattr(model, 'n_features_in_', 1)))
+                if scaler is not None:
+                    dummy = scaler.transform(dummy)
+                model.predict_proba(dummy)
+            except Exception as e:
+                self.logger.warning(f"Model warm-up failed: {e}")
+
+        # Schemas the loaded models actually consume; extraction skips
+        # feature groups (notably BERT/TF-IDF) outside these sets
+        self.text_required = frozenset(self.text_feature_names) if self.text_feature_names else None
+        self.hybrid_required = frozenset(self.hybrid_feature_names) if self.hybrid_feature_names else None
+
+        # Key tuples fixed at load time; predict fills a pre-shaped row
+        # buffer instead of building a list and re-inferring dtype per call
+        self._url_keys = tuple(self.url_feature_names) if self.url_feature_names else None
+        self._text_keys = tuple(self.text_feature_names) if self.text_feature_names else None
+        self._hybrid_keys = tuple(self.hybrid_feature_names) if self.hybrid_feature_names else None
+
+        # Compiled row specs: one itemgetter call pulls all values in C
+        self._url_spec = self._make_row_spec(self._url_keys)
+        self._text_spec = self._make_row_spec(self._text_keys)
+        self._hybrid_spec = self._make_row_spec(self._hybrid_keys)
+
+    @staticmethod
+    def _make_row_spec(keys: Optional[Tuple[str, ...]]):
+        """Build a (getter, defaults, n) spec for C-speed row extraction."""
+        if keys is None:
+            return None
+        return operator.itemgetter(*keys), {key: 0.0 for key in keys}, len(keys)
+
+    @staticmethod
+    def _vectorize(raw_features: Dict[str, float], spec) -> np.ndarray:
+        """Pull one (1, n) float32 row in training-time column order.
+
+        The spec's itemgetter grabs every value in a single C call over
+        a defaults-backed dict, replacing N Python dict.get lookups.
+        """
+        if spec is None:
+            return np.array([list(raw_features.values())], dtype=np.float32)
+        getter, defaults, n = spec
+        values = getter({**defaults, **raw_features})
+        if n == 1:
+            values = (values,)
+        return np.asarray(values, dtype=np.float32).reshape(1, n)
+
+    def _vectorize_text(self, text: str) -> np.ndarray:
+        """Extract, order and scale one text's feature row (LRU-wrapped in __init__)."""
+        raw_features = self.nlp_extractor.extract_features(text, self.text_required)
+        feature_vector = self._vectorize(raw_features, self._text_spec)
+        if self.text_scaler is not None:
+            feature_vector = self.text_scaler.transform(feature_vector)
+        return feature_vector
+
+    def _vectorize_hybrid(self, url: str, text: Optional[str]) -> np.ndarray:
+        """Extract, order and scale one (url, text) feature row."""
+        raw_features = self.hybrid_extractor.extract_features(url, text, self.hybrid_required)
+        feature_vector = self._vectorize(raw_features, self._hybrid_spec)
+        if self.hybrid_scaler is not None:
+            feature_vector = self.hybrid_scaler.transform(feature_vector)
+        return feature_vector
+
+    @staticmethod
+    def _vectorize_rows(feature_dicts: List[Dict[str, float]], spec) -> np.ndarray:
+        """Stack per-row feature dicts into one (M, n) float32 matrix."""
+        if spec is None:
+            return np.array([list(raw.values()) for raw in feature_dicts], dtype=np.float32)
+        getter, defaults, n = spec
+        rows = [getter({**defaults, **raw}) for raw in feature_dicts]
+        if n == 1:
+            rows = [(value,) for value in rows]
+        return np.asarray(rows, dtype=np.float32)
+
+    def _predict_matrix(self, model, scaler, matrix: np.ndarray) -> List[Tuple[str, float]]:
+        """Run one model call over a feature matrix and label each row."""
+        if scaler is not None:
+            matrix = scaler.transform(matrix)
+        # One predict_proba; the label falls out of argmax, so the model
+        # isn't evaluated a second time for predict()
+        probabilities = self._predict_proba_parallel(model, matrix)
+        classes = model.classes_
+        indices = np.argmax(probabilities, axis=1)
+        return [
+            ("Phishing" if int(classes[idx]) == 1 else "Legitimate", float(prob[idx]))
+            for idx, prob in zip(indices, probabilities)
+        ]
+
+    @staticmethod
+    def _predict_proba_parallel(model, matrix: np.ndarray) -> np.ndarray:
+        """predict_proba over row chunks on threads for large batches.
+
+        Tree traversal releases the GIL in C, so thread workers scale to
+        core count without any pickling of the model or rows.
+        """
+        n_jobs = os.cpu_count() or 1
+        if matrix.shape[0] < _PARALLEL_MIN_ROWS or n_jobs == 1:
+            return model.predict_proba(matrix)
+
+        splits = [split for split in np.array_split(matrix, n_jobs) if len(split)]
+        parts = Parallel(n_jobs=n_jobs, prefer='threads')(
+            delayed(model.predict_proba)(split) for split in splits
+        )
+        return np.concatenate(parts)
+
+    def predict_url_batch(self, urls: List[str]) -> List[Tuple[str, float]]:
+        """Predict phishing probability for a batch of URLs in one model call."""
+        self._ensure_loaded()
+        if self.url_model is None:
+            return [("Model not available", 0.0)] * len(urls)
+
+        try:
+            matrix = self._vectorize_rows(
+                [self.url_extractor.extract_features(url) for url in urls],
+                self._url_spec
+            )
+            return self._predict_matrix(self.url_model, self.url_scaler, matrix)
+        except Exception as e:
+            self.logger.error(f"Error predicting URL batch: {e}")
+            return [("Error", 0.0)] * len(urls)
+
+    def predict_text_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Predict phishing probability for a batch of texts in one model call."""
+        self._ensure_loaded()
+        if self.text_model is None:
+            return [("Model not available", 0.0)] * len(texts)
+
+        try:
+            # Per-text rows come from the LRU-cached vectorizer, so repeat
+            # submissions skip extraction and scaling even through the
+            # micro-batched endpoint; rows are already scaled, hence no
+            # scaler is passed downstream
+            matrix = np.vstack([self._vectorize_text_cached(text) for text in texts])
+            return self._predict_matrix(self.text_model, None, matrix)
+        except Exception as e:
+            self.logger.error(f"Error predicting text batch: {e}")
+            return [("Error", 0.0)] * len(texts)
+
+    def predict_hybrid_batch(self, items: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, float]]:
+        """Predict phishing probability for a batch of (url, text) pairs in one model call."""
+        self._ensure_loaded()
+        if self.hybrid_model is None:
+            return [("Model not available", 0.0)] * len(items)
+
+        try:
+            # extract_many keeps every item's WHOIS lookup and page fetch
+            # in flight together; extracting per item here would serialize
+            # seconds of network waits inside one batch worker
+            urls = [url for url, _ in items]
+            texts = [text for _, text in items]
+            matrix = self._vectorize_rows(
+                self.hybrid_extractor.extract_many(urls, texts, self.hybrid_required),
+                self._hybrid_spec
+            )
+            return self._predict_matrix(self.hybrid_model, self.hybrid_scaler, matrix)
+        except Exception as e:
+            self.logger.error(f"Error predicting hybrid batch: {e}")
+            return [("Error", 0.0)] * len(items)
+
     def predict_url(self, url: str) -> Tuple[str, float]:
         """Predict phishing probability for URL."""
+        self._ensure_loaded()
         if self.url_model is None:
             return "Model not available", 0.0
         
         try:
             raw_features = self.url_extractor.extract_features(url)
-            if self.url_feature_names:
-                ordered = [raw_features.get(name, 0.0) for name in self.url_feature_names]
-            else:
-                ordered = list(raw_features.values())
-            feature_vector = np.array(ordered, dtype=float).reshape(1, -1)
+            feature_vector = self._vectorize(raw_features, self._url_spec)
             if self.url_scaler is not None:
                 feature_vector = self.url_scaler.transform(feature_vector)
-            prediction = self.url_model.predict(feature_vector)[0]
             probability = self.url_model.predict_proba(feature_vector)[0]
-            confidence = float(np.max(probability))
-            result = "Phishing" if int(prediction) == 1 else "Legitimate"
+            idx = int(np.argmax(probability))
+            confidence = float(probability[idx])
+            result = "Phishing" if int(self.url_model.classes_[idx]) == 1 else "Legitimate"
             return result, confidence
         except Exception as e:
             self.logger.error(f"Error predicting URL: {e}")
@@ -117,22 +368,16 @@ class ModelLoader:
     
     def predict_text(self, text: str) -> Tuple[str, float]:
         """Predict phishing probability for text."""
+        self._ensure_loaded()
         if self.text_model is None:
             return "Model not available", 0.0
         
         try:
-            raw_features = self.nlp_extractor.extract_features(text)
-            if self.text_feature_names:
-                ordered = [raw_features.get(name, 0.0) for name in self.text_feature_names]
-            else:
-                ordered = list(raw_features.values())
-            feature_vector = np.array(ordered, dtype=float).reshape(1, -1)
-            if self.text_scaler is not None:
-                feature_vector = self.text_scaler.transform(feature_vector)
-            prediction = self.text_model.predict(feature_vector)[0]
+            feature_vector = self._vectorize_text_cached(text)
             probability = self.text_model.predict_proba(feature_vector)[0]
-            confidence = float(np.max(probability))
-            result = "Phishing" if int(prediction) == 1 else "Legitimate"
+            idx = int(np.argmax(probability))
+            confidence = float(probability[idx])
+            result = "Phishing" if int(self.text_model.classes_[idx]) == 1 else "Legitimate"
             return result, confidence
         except Exception as e:
             self.logger.error(f"Error predicting text: {e}")
@@ -140,22 +385,16 @@ class ModelLoader:
     
     def predict_hybrid(self, url: str, text: str = None) -> Tuple[str, float]:
         """Predict phishing probability using hybrid model."""
+        self._ensure_loaded()
         if self.hybrid_model is None:
             return "Model not available", 0.0
         
         try:
-            raw_features = self.hybrid_extractor.extract_features(url, text)
-            if self.hybrid_feature_names:
-                ordered = [raw_features.get(name, 0.0) for name in self.hybrid_feature_names]
-            else:
-                ordered = list(raw_features.values())
-            feature_vector = np.array(ordered, dtype=float).reshape(1, -1)
-            if self.hybrid_scaler is not None:
-                feature_vector = self.hybrid_scaler.transform(feature_vector)
-            prediction = self.hybrid_model.predict(feature_vector)[0]
+            feature_vector = self._vectorize_hybrid(url, text)
             probability = self.hybrid_model.predict_proba(feature_vector)[0]
-            confidence = float(np.max(probability))
-            result = "Phishing" if int(prediction) == 1 else "Legitimate"
+            idx = int(np.argmax(probability))
+            confidence = float(probability[idx])
+            result = "Phishing" if int(self.hybrid_model.classes_[idx]) == 1 else "Legitimate"
             return result, confidence
         except Exception as e:
             self.logger.error(f"Error predicting hybrid: {e}")
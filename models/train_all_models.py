@@ -1,17 +1,19 @@
 """
 Master script to train all phishing detection models.
-Runs URL, text, and hybrid model training sequentially.
+Loads the dataset once and trains the URL, text, and hybrid models
+in parallel worker processes.
 """
 
 import os
 import sys
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from train_url_model import train_url_model
+from train_url_model import load_phishing_dataset, train_url_model
 from train_text_model import train_text_model
 from train_hybrid import train_hybrid_model
 
@@ -35,27 +37,26 @@ def train_all_models():
     start_time = datetime.now()
     
     try:
-        # Train URL model
-        logger.info("=" * 50)
-        logger.info("TRAINING URL MODEL")
-        logger.info("=" * 50)
-        url_model, url_scaler, url_features = train_url_model()
-        logger.info("URL model training completed successfully")
-        
-        # Train text model
-        logger.info("=" * 50)
-        logger.info("TRAINING TEXT MODEL")
-        logger.info("=" * 50)
-        text_model, text_vectorizer, text_features = train_text_model()
-        logger.info("Text model training completed successfully")
-        
-        # Train hybrid model
+        # Load the dataset once; the three trainers are independent, so
+        # each worker process gets the shared frame instead of re-reading
+        # the CSV, and the fits overlap instead of summing
+        logger.info("Loading dataset...")
+        df = load_phishing_dataset()
+
         logger.info("=" * 50)
-        logger.info("TRAINING HYBRID MODEL")
+        logger.info("TRAINING URL / TEXT / HYBRID MODELS IN PARALLEL")
         logger.info("=" * 50)
-        hybrid_model, hybrid_scaler, hybrid_features = train_hybrid_model()
-        logger.info("Hybrid model training completed successfully")
-        
+        with ProcessPoolExecutor(max_workers=3) as executor:
+            url_future = executor.submit(train_url_model, df)
+            text_future = executor.submit(train_text_model, df)
+            hybrid_future = executor.submit(train_hybrid_model, df)
+            url_model, url_scaler, url_features = url_future.result()
+            logger.info("URL model training completed successfully")
+            text_model, text_vectorizer, text_features = text_future.result()
+            logger.info("Text model training completed successfully")
+            hybrid_model, hybrid_scaler, hybrid_features = hybrid_future.result()
+            logger.info("Hybrid model training completed successfully")
+
         end_time = datetime.now()
         duration = end_time - start_time
         
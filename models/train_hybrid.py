@@ -1,38 +1,52 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingClassifier
+from lightgbm import LGBMClassifier
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics import classification_report
+from scipy.sparse import hstack, csr_matrix
 import joblib
 import numpy as np
 
-def train_hybrid_model():
+def train_hybrid_model(df=None):
     """Train hybrid phishing detection model."""
-    # Load Dataset (structured phishing data)
-    df = pd.read_csv("data/phishing.csv")
-    X1 = df.drop("CLASS_LABEL", axis=1)  # All features except target
+    # Load Dataset (structured phishing data) unless the caller shares one
+    if df is None:
+        from train_url_model import load_phishing_dataset
+        df = load_phishing_dataset()
+    X1 = df.drop("CLASS_LABEL", axis=1).astype(np.float32)  # All features except target
     y = df["CLASS_LABEL"]  # Target variable
 
     # Create synthetic text features from URL characteristics for hybrid model
     # This simulates text analysis using structured features
-    text_features = df[["NumDots", "SubdomainLevel", "PathLevel", "UrlLength", "NumDash", "NumUnderscore"]].astype(str).agg(' '.join, axis=1)
+    # Column-wise `+` concat stays in C; .agg(' '.join, axis=1) would
+    # call a Python join per row
+    cols = ["NumDots", "SubdomainLevel", "PathLevel", "UrlLength", "NumDash", "NumUnderscore"]
+    text_features = df[cols[0]].astype(str)
+    for col in cols[1:]:
+        text_features = text_features + ' ' + df[col].astype(str)
 
     # TF-IDF on synthetic text features (reduced features for memory)
-    vectorizer = TfidfVectorizer(max_features=1000, analyzer="char", ngram_range=(2,3))
+    vectorizer = TfidfVectorizer(max_features=1000, analyzer="char", ngram_range=(2,3), dtype=np.float32)
     X2_vec = vectorizer.fit_transform(text_features)
 
-    # Combine features
-    X_combined = np.hstack((X1.values, X2_vec.toarray()))
+    # Combine features; keeping the TF-IDF block sparse avoids
+    # materializing rows x 1000 of mostly zeros
+    X_combined = hstack([csr_matrix(X1.values), X2_vec]).tocsr()
 
     X_train, X_test, y_train, y_test = train_test_split(X_combined, y, test_size=0.2, random_state=42)
 
-    model = GradientBoostingClassifier()
+    # Multithreaded histogram boosting; trains on the sparse matrix directly
+    model = LGBMClassifier(n_estimators=200, num_leaves=63, n_jobs=-1)
     model.fit(X_train, y_train)
 
     print(classification_report(y_test, model.predict(X_test)))
 
-    joblib.dump(model, "../backend/app/models/hybrid_model.pkl")
-    joblib.dump(vectorizer, "../backend/app/models/hybrid_vectorizer.pkl")
+    # compress=0 keeps the arrays mmap-able when the backend loads them
+    joblib.dump(model, "../backend/app/models/hybrid_model.pkl", compress=0)
+    joblib.dump(vectorizer, "../backend/app/models/hybrid_vectorizer.pkl", compress=0)
+
+    from train_url_model import export_onnx
+    export_onnx(model, X_combined.shape[1], "../backend/app/models/hybrid_model.onnx")
     
     return model, vectorizer, list(X1.columns) + ["synthetic_text_features"]
 
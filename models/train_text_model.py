@@ -1,22 +1,32 @@
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
 import joblib
 
-def train_text_model():
+def train_text_model(df=None):
     """Train text-based phishing detection model."""
-    # Load phishing dataset (using available phishing.csv)
-    df = pd.read_csv("data/phishing.csv")
+    # Load phishing dataset unless the caller shares one
+    if df is None:
+        from train_url_model import load_phishing_dataset
+        df = load_phishing_dataset()
     # For text model, we'll create synthetic text features from URL characteristics
     # This is a workaround since we don't have actual URL text
-    X = df[["NumDots", "SubdomainLevel", "PathLevel", "UrlLength", "NumDash", "NumUnderscore"]].astype(str).agg(' '.join, axis=1)
+    # Column-wise `+` concat stays in C; .agg(' '.join, axis=1) would
+    # call a Python join per row
+    cols = ["NumDots", "SubdomainLevel", "PathLevel", "UrlLength", "NumDash", "NumUnderscore"]
+    X = df[cols[0]].astype(str)
+    for col in cols[1:]:
+        X = X + ' ' + df[col].astype(str)
     y = df["CLASS_LABEL"]  # 0=legitimate, 1=phishing
 
-    # TF-IDF Vectorization
-    vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(2,5), analyzer="char")
-    X_vec = vectorizer.fit_transform(X)
+    # Stateless hashing vectorization: one streaming pass, no vocabulary
+    # dict to build or store, and the hasher needs no fitting
+    vectorizer = HashingVectorizer(n_features=262144, analyzer="char", ngram_range=(2,5),
+                                   alternate_sign=False, dtype=np.float32)
+    X_vec = vectorizer.transform(X)
 
     X_train, X_test, y_train, y_test = train_test_split(X_vec, y, test_size=0.2, random_state=42)
 
@@ -25,9 +35,13 @@ def train_text_model():
 
     print(classification_report(y_test, model.predict(X_test)))
 
-    # Save model + vectorizer
-    joblib.dump(model, "../backend/app/models/text_model.pkl")
-    joblib.dump(vectorizer, "../backend/app/models/tfidf_vectorizer.pkl")
+    # Save model + vectorizer; compress=0 keeps the arrays mmap-able
+    # when the backend loads them
+    joblib.dump(model, "../backend/app/models/text_model.pkl", compress=0)
+    joblib.dump(vectorizer, "../backend/app/models/tfidf_vectorizer.pkl", compress=0)
+
+    from train_url_model import export_onnx
+    export_onnx(model, X_vec.shape[1], "../backend/app/models/text_model.onnx")
     
     return model, vectorizer, ["synthetic_text_features"]
 
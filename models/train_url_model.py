@@ -1,15 +1,29 @@
+import os
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
 import joblib
 
-def train_url_model():
+def load_phishing_dataset(csv_path="data/phishing.csv"):
+    """Load the training dataset, converting the CSV to Parquet on first use.
+
+    Parquet reads are columnar and multithreaded with dtypes preserved,
+    so every run after the one-time conversion skips CSV parsing.
+    """
+    parquet_path = csv_path.rsplit(".", 1)[0] + ".parquet"
+    if not os.path.exists(parquet_path):
+        pd.read_csv(csv_path).to_parquet(parquet_path, engine="pyarrow")
+    return pd.read_parquet(parquet_path, engine="pyarrow")
+
+def train_url_model(df=None):
     """Train URL-based phishing detection model."""
-    # Load structured phishing dataset
-    df = pd.read_csv("data/phishing.csv")
+    # Load structured phishing dataset unless the caller shares one
+    if df is None:
+        df = load_phishing_dataset()
 
-    X = df.drop("CLASS_LABEL", axis=1)   # features
+    X = df.drop("CLASS_LABEL", axis=1).astype(np.float32)   # features
     y = df["CLASS_LABEL"]                # target (0=legit, 1=phish)
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -19,9 +33,47 @@ def train_url_model():
 
     print(classification_report(y_test, model.predict(X_test)))
 
-    joblib.dump(model, "../backend/app/models/url_model.pkl")
-    
+    # compress=0 keeps the arrays mmap-able when the backend loads them
+    joblib.dump(model, "../backend/app/models/url_model.pkl", compress=0)
+
+    export_onnx(model, X_train.shape[1], "../backend/app/models/url_model.onnx")
+
     return model, None, list(X.columns)
 
+def export_onnx(model, n_features, path):
+    """Export the model as an ONNX graph for the backend's onnxruntime path."""
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError:
+        print("skl2onnx not installed; backend will use the pickle")
+        return
+
+    try:
+        if type(model).__name__ == "LGBMClassifier":
+            # skl2onnx has no built-in LightGBM converter; register the
+            # onnxmltools one before converting
+            from lightgbm import LGBMClassifier
+            from onnxmltools.convert.lightgbm.operator_converters.LightGbm import convert_lightgbm
+            from skl2onnx import update_registered_converter
+            from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+            update_registered_converter(
+                LGBMClassifier, "LightGbmLGBMClassifier",
+                calculate_linear_classifier_output_shapes, convert_lightgbm,
+                options={"nocl": [True, False], "zipmap": [True, False, "columns"]},
+            )
+        onx = convert_sklearn(
+            model,
+            initial_types=[("input", FloatTensorType([None, n_features]))],
+            options={id(model): {"zipmap": False}},
+        )
+    except Exception as e:
+        # Conversion is best-effort; a failed export must not fail training
+        print(f"ONNX export failed ({e}); backend will use the pickle")
+        return
+
+    with open(path, "wb") as f:
+        f.write(onx.SerializeToString())
+
 if __name__ == "__main__":
     train_url_model()